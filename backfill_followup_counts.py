@@ -0,0 +1,36 @@
+# backfill_followup_counts.py
+# One-off: store follow_up_count / last_followup_at on every enquiry doc,
+# so MANAGE_ENQUIRIES can list enquiries without reading the followups subcollections.
+from firebase.firebase_config import db
+from firebase.timestamps import to_local
+
+BATCH_SIZE = 500
+
+def main():
+    batch = db.batch()
+    pending = 0
+    updated = 0
+    for enq in db.collection("enquiries").stream():
+        count = 0
+        last = None
+        for f in enq.reference.collection("followups").stream():
+            count += 1
+            ts = to_local(f.to_dict().get("timestamp"))
+            if ts and (last is None or ts > last):
+                last = ts
+        batch.update(enq.reference, {
+            "follow_up_count": count,
+            "last_followup_at": last
+        })
+        pending += 1
+        updated += 1
+        if pending == BATCH_SIZE:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    print(f"Backfilled follow-up counters on {updated} enquiries.")
+
+if __name__ == "__main__":
+    main()
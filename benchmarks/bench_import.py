@@ -0,0 +1,44 @@
+# benchmarks/bench_import.py
+# Bulk-import throughput: validate and write N synthetic students.
+# Run against the emulator, never production:
+#
+#   firebase emulators:start --only firestore
+#   FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/bench_import.py --count 5000
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bulk_import  # noqa: E402
+
+def synthetic_sheet(count):
+    return pd.DataFrame([{
+        "name": f"Bench Student {i}", "gender": "Female", "class": str(i % 10 + 1),
+        "section": "ABCDE"[i % 5], "father_name": "Father", "father_mobile": f"9{i:09d}",
+        "mother_name": "Mother", "mother_mobile": f"8{i:09d}", "address": "Benchmark Road",
+        "balance_due_date": "2026-06-01", "payment_mode": "Cash",
+        "school_fee": "12000", "paid": "2000",
+    } for i in range(count)]).astype(str)
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark bulk student import.")
+    ap.add_argument("--count", type=int, default=5000, help="students to import")
+    args = ap.parse_args()
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        sys.exit("Set FIRESTORE_EMULATOR_HOST; this benchmark writes students.")
+
+    start = time.perf_counter()
+    students, rejected = bulk_import.prepare(synthetic_sheet(args.count))
+    validate = time.perf_counter() - start
+    written, write = bulk_import.import_students(students)
+    total = validate + write
+    print(f"students          : {len(written)} ({len(rejected)} rejected)")
+    print(f"validate          : {validate:8.2f} s")
+    print(f"write (500/batch) : {write:8.2f} s")
+    print(f"throughput        : {len(written) / total:8.0f} students/s")
+
+if __name__ == "__main__":
+    main()
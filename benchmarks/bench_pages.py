@@ -0,0 +1,192 @@
+# benchmarks/bench_pages.py
+# Page hot paths against the in-memory Firestore backend, at several data
+# sizes. Every run is appended to benchmarks/results.jsonl and compared with
+# the previous run of the same size, so regressions show up in review.
+#
+#   python benchmarks/bench_pages.py                    # 1k, 10k, 50k students
+#   python benchmarks/bench_pages.py --sizes 1000 --repeat 3
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+os.environ["WISDOM_FIRESTORE_BACKEND"] = "memory"
+os.environ.setdefault("WISDOM_FIRESTORE_LOG", "")
+_scratch = tempfile.mkdtemp()
+os.environ.setdefault("WISDOM_REPLICA_PATH", os.path.join(_scratch, "replica.db"))
+os.environ.setdefault("WISDOM_OUTBOX_PATH", os.path.join(_scratch, "outbox.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st  # noqa: E402
+
+from firebase import data  # noqa: E402
+from firebase.firebase_config import get_db  # noqa: E402
+from firebase.timestamps import LOCAL_TZ  # noqa: E402
+from students_table import students_table_html  # noqa: E402
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.jsonl")
+SIZES = [1000, 10000, 50000]
+BATCH = 500
+
+# ─── Seed data ───────────────────────────────────────────────────────────────────
+class _Writer:
+    def __init__(self, db):
+        self.db, self.batch, self.n = db, db.batch(), 0
+
+    def set(self, ref, doc):
+        self.batch.set(ref, doc)
+        self.n += 1
+        if self.n == BATCH:
+            self.flush()
+
+    def flush(self):
+        if self.n:
+            self.batch.commit()
+            self.batch, self.n = self.db.batch(), 0
+
+def seed(db, n):
+    """n students (2 in 3 with a balance, half with a receipt), n/5 enquiries
+    with two follow-ups each, n/2 visitors over the last 30 days."""
+    w = _Writer(db)
+    start = datetime(2025, 6, 1, 9, 0, tzinfo=LOCAL_TZ)
+    for i in range(1, n + 1):
+        adm = f"{i:04d}"
+        total = 20000
+        balance = 0 if i % 3 == 0 else 5000 + i % 7 * 1000
+        ref = db.collection("students").document(adm)
+        w.set(ref, {
+            "name": f"Student {i}", "admission_no": adm, "bill_no": str(1000 + i),
+            "class": str(i % 10 + 1), "section": "ABCDE"[i % 5],
+            "father_mobile": f"9{i:09d}", "mother_mobile": f"8{i:09d}",
+            "total_fee": total, "paid": total - balance, "balance": balance,
+            "registration_date": start.isoformat(), "photo_path": "",
+        })
+        if i % 2 == 0:
+            w.set(ref.collection("receipts").document(), {
+                "amount": 1000, "receipt_no": 10000 + i, "mode": "Cash",
+                "timestamp": (start + timedelta(minutes=i)).isoformat(),
+            })
+    for i in range(n // 5):
+        ref = db.collection("enquiries").document()
+        inquiry = start + timedelta(hours=i)
+        w.set(ref, {
+            "name": f"Enquirer {i}", "mobile": f"7{i:09d}", "class_interested": "LKG",
+            "status": "New", "lead_temp": "Warm", "inquiry_date": inquiry,
+            "next_followup": inquiry + timedelta(days=2), "follow_up_count": 2,
+        })
+        for k in range(2):
+            w.set(ref.collection("followups").document(), {
+                "comment": "called", "timestamp": inquiry + timedelta(days=k),
+            })
+    for i in range(n // 2):
+        t = start + timedelta(minutes=17 * i % (30 * 24 * 60))
+        w.set(db.collection("visitors").document(), {
+            "name": f"Visitor {i}", "mobile": f"6{i:09d}", "purpose": "Enquiry",
+            "time_in": t, "time_out": None, "visit_date": t.date().isoformat(),
+        })
+    w.flush()
+
+# ─── Timing ──────────────────────────────────────────────────────────────────────
+def _time(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(runs), 2)
+
+def run_size(n, repeat):
+    st.cache_data.clear()
+    st.cache_resource.clear()   # fresh in-memory store, listeners and caches
+    db = get_db()
+    seed(db, n)
+
+    def cold_receipts():
+        data.load_receipt_index.clear()
+        return data.load_receipt_index()
+    receipt_index = cold_receipts()
+    q, order = data.students_query()
+    rows = data.load_students(q)
+
+    def cold_due():
+        data.due_students_view().close()
+        data.due_students_view.clear()
+        return data.load_due_students()
+
+    due = data.load_due_students()
+    payers = iter(due)
+    visit_day = date(2025, 6, 2)   # inside the seeded 30 days
+
+    def payment():
+        s = next(payers)
+        data.process_payment(db.collection("students").document(s["admission_no"]),
+                             1.0, "Cash", date.today(), "benchmark")
+
+    def queued_payment():
+        data.record_payment(next(payers), 1.0, "Cash", date.today(), "benchmark")
+
+    return {
+        "load_students": _time(lambda: data.load_students(q), repeat),
+        "load_students_page_50": _time(lambda: data.load_students_page(q, order, 50), repeat),
+        "students_table_html_200": _time(lambda: students_table_html(rows[:200], receipt_index), repeat),
+        "students_table_html_all": _time(lambda: students_table_html(rows, receipt_index), repeat),
+        "load_receipt_index": _time(cold_receipts, repeat),
+        "fetch_enquiries": _time(data.fetch_enquiries, repeat),
+        "replica_students_page_50": _time(lambda: data.replica_students_page(fstat="Due"), repeat),
+        "load_roster": _time(data.load_roster, repeat),
+        "load_visitors_day": _time(lambda: data.load_visitors(visit_day, visit_day + timedelta(days=1)), repeat),
+        "get_due_students_cold": _time(cold_due, repeat),
+        "get_due_students": _time(data.load_due_students, repeat),
+        "payment": _time(payment, repeat),
+        "record_payment": _time(queued_payment, repeat),
+    }
+
+# ─── Results file ────────────────────────────────────────────────────────────────
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _previous(size):
+    last = None
+    if os.path.exists(RESULTS):
+        with open(RESULTS, encoding="utf-8") as fp:
+            for line in fp:
+                rec = json.loads(line)
+                if rec.get("students") == size:
+                    last = rec
+    return last
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark page hot paths on the in-memory backend.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="student counts")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per measurement (median)")
+    ap.add_argument("--no-record", action="store_true", help=f"do not append to {RESULTS}")
+    args = ap.parse_args()
+
+    for n in args.sizes:
+        prev = _previous(n)
+        timings = run_size(n, args.repeat)
+        print(f"\n{n} students  (median of {args.repeat}, ms)")
+        for name, ms in timings.items():
+            old = (prev or {}).get("ms", {}).get(name)
+            delta = f"  {100 * (ms - old) / old:+6.1f}% vs {prev['rev']}" if old else ""
+            print(f"  {name:<26}{ms:10.2f}{delta}")
+        if not args.no_record:
+            with open(RESULTS, "a", encoding="utf-8") as fp:
+                fp.write(json.dumps({
+                    "ts": datetime.now().isoformat(timespec="seconds"),
+                    "rev": _git_rev(), "python": platform.python_version(),
+                    "students": n, "repeat": args.repeat, "ms": timings,
+                }) + "\n")
+
+if __name__ == "__main__":
+    main()
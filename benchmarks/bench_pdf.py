@@ -0,0 +1,58 @@
+# benchmarks/bench_pdf.py
+# Per-receipt render time with the cached template layer vs. the old
+# per-call setup (fresh stylesheet/TableStyles, full-resolution logo).
+#
+#   python benchmarks/bench_pdf.py --count 1000
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pdf_builders  # noqa: E402
+
+STUDENT = {
+    "name": "Benchmark Student", "admission_no": "0001",
+    "class": "5", "section": "A", "fee_due_date": "2025-06-01",
+}
+
+def _uncached_asset(path):
+    # old behaviour: hand ReportLab the original file on every render
+    if not isinstance(path, str) or not os.path.exists(path):
+        return None
+    pdf_builders._styles.cache_clear()
+    pdf_builders._table_styles.cache_clear()
+    return path
+
+def run(count, cached):
+    real_asset = pdf_builders._asset
+    if not cached:
+        pdf_builders._asset = _uncached_asset
+    try:
+        start = time.perf_counter()
+        for rno in range(1, count + 1):
+            pdf_builders.build_receipt_pdf(STUDENT, 500.0, "Cash", date.today(), rno, 1500.0)
+        return (time.perf_counter() - start) / count
+    finally:
+        pdf_builders._asset = real_asset
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark receipt PDF rendering.")
+    ap.add_argument("--count", type=int, default=1000, help="receipts per run")
+    ap.add_argument("--logo", default=pdf_builders.LOGO_PATH, help="logo image to embed")
+    args = ap.parse_args()
+
+    pdf_builders.LOGO_PATH = args.logo
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_builders.RECEIPT_DIR = tmp
+        before = run(args.count, cached=False)
+        after  = run(args.count, cached=True)
+    print(f"receipts per run : {args.count}")
+    print(f"before (per call): {before * 1000:8.2f} ms/receipt")
+    print(f"after  (cached)  : {after * 1000:8.2f} ms/receipt")
+    print(f"speed-up         : {before / after:8.1f}x")
+
+if __name__ == "__main__":
+    main()
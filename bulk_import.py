@@ -0,0 +1,140 @@
+# bulk_import.py
+# Import students from a CSV / Excel sheet: every row is checked with the
+# Register Student form's rules, admission and bill numbers are reserved one
+# block per chunk, and each chunk of 500 students is written in one WriteBatch.
+#
+# Column headers are the Firestore field names (name, dob, gender, class,
+# section, father_mobile, ... , paid, balance_due_date); see STUDENT_COLUMNS.
+#
+#   python bulk_import.py students.xlsx --dry-run
+#   python bulk_import.py students.csv
+import argparse
+import os
+import time
+from datetime import date, datetime
+
+import pandas as pd
+
+from firebase.data import allocate_number_block, format_adm_no
+from firebase.firebase_config import get_db
+from student_fields import (
+    CHOICE_FIELDS, FEE_FIELDS, canonical_choice, fee_totals, validate_student,
+)
+
+CHUNK_SIZE = 500   # Firestore's limit on writes per batch
+
+TEXT_COLUMNS = [
+    "name", "gender", "aadhar", "blood_group", "previous_school",
+    "father_name", "father_mobile", "mother_name", "mother_mobile",
+    "parent_email", "address", "class", "section", "payment_mode", "photo_path",
+]
+DATE_COLUMNS   = ["dob", "balance_due_date"]
+NUMBER_COLUMNS = FEE_FIELDS + ["discount", "paid"]
+STUDENT_COLUMNS = TEXT_COLUMNS + DATE_COLUMNS + NUMBER_COLUMNS
+
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S")
+
+def read_table(src, filename=None):
+    """DataFrame of strings from a CSV/XLSX path or uploaded file."""
+    filename = filename or getattr(src, "name", None) or str(src)
+    if filename.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(src, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_csv(src, dtype=str, keep_default_na=False)
+    df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
+    return df
+
+def _parse_date(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(value)
+
+def row_to_student(raw):
+    """(student dict, errors) for one sheet row."""
+    rec, errors = {}, []
+    for col in TEXT_COLUMNS:
+        rec[col] = str(raw.get(col, "")).strip()
+        if col in CHOICE_FIELDS:
+            rec[col] = canonical_choice(col, rec[col])
+    for col in DATE_COLUMNS:
+        val = str(raw.get(col, "")).strip()
+        if not val:
+            rec[col] = date.today().isoformat() if col == "dob" else ""
+            continue
+        try:
+            rec[col] = _parse_date(val).isoformat()
+        except ValueError:
+            rec[col] = ""
+            errors.append(f"{col} '{val}' is not a date")
+    for col in NUMBER_COLUMNS:
+        val = str(raw.get(col, "")).strip() or "0"
+        try:
+            rec[col] = int(float(val))
+        except ValueError:
+            rec[col] = 0
+            errors.append(f"{col} '{val}' is not a number")
+    rec["total_fee"], rec["balance"] = fee_totals(rec)
+    return rec, errors + validate_student(rec)
+
+def prepare(df):
+    """Split sheet rows into (students, rejected) where rejected is [(line, errors)]."""
+    students, rejected = [], []
+    for i, raw in enumerate(df.to_dict("records")):
+        rec, errors = row_to_student(raw)
+        if errors:
+            rejected.append((i + 2, errors))   # +1 header row, +1 one-based
+        else:
+            students.append(rec)
+    return students, rejected
+
+def import_students(students, chunk_size=CHUNK_SIZE, progress=None):
+    """Write validated students; returns (written docs, seconds taken).
+
+    `progress(done, total)` is called after every committed chunk.
+    """
+    db = get_db()
+    col = db.collection("students")
+    written = []
+    start = time.perf_counter()
+    for i in range(0, len(students), chunk_size):
+        chunk = students[i:i + chunk_size]
+        first_adm, first_bill = allocate_number_block(len(chunk))
+        reg_dt = datetime.now().isoformat()
+        batch = db.batch()
+        docs = []
+        for n, rec in enumerate(chunk):
+            doc = dict(rec,
+                       admission_no=format_adm_no(first_adm + n),
+                       bill_no=str(first_bill + n),
+                       registration_date=reg_dt)
+            batch.set(col.document(doc["admission_no"]), doc)
+            docs.append(doc)
+        batch.commit()
+        written.extend(docs)
+        if progress:
+            progress(len(written), len(students))
+    return written, time.perf_counter() - start
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk-import students from CSV / Excel.")
+    ap.add_argument("file", help="CSV or XLSX sheet")
+    ap.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    args = ap.parse_args()
+
+    students, rejected = prepare(read_table(args.file))
+    for line, errors in rejected:
+        print(f"  line {line}: {'; '.join(errors)}")
+    print(f"{len(students)} valid row(s), {len(rejected)} rejected in {os.path.basename(args.file)}")
+    if args.dry_run or not students:
+        return
+    written, secs = import_students(
+        students, progress=lambda done, total: print(f"  {done}/{total}", end="\r")
+    )
+    print(f"Imported {len(written)} students in {secs:.1f}s "
+          f"({len(written) / max(secs, 1e-9):.0f} students/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,754 @@
+# firebase/data.py
+# Firestore reads/writes behind the pages, kept out of the page scripts so
+# they can be shared and benchmarked (benchmarks/bench_pages.py).
+import os
+from datetime import date, datetime, timedelta
+
+import uuid
+
+import pandas as pd
+import streamlit as st
+from firebase_admin import firestore
+from google.api_core import exceptions
+
+from firebase.firebase_config import get_db
+from firebase.live import LiveQueryView
+from firebase.outbox import Outbox
+from firebase.receipt_numbers import (
+    RECEIPT_MODE, RECEIPT_START, ReceiptNumberBlock, TransactionStats,
+)
+from firebase.replica import Replica, ReplicaSync
+from firebase.timestamps import start_of_day
+from pdf_builders import RECEIPT_DIR, receipt_pdf_name
+from search_index import SearchIndex
+
+BILL_START = 1001  # now starts at 1001
+ADM_START  = 1
+
+REPLICA_ENABLED = os.environ.get("WISDOM_REPLICA", "1") != "0"
+OUTBOX_ENABLED  = os.environ.get("WISDOM_OUTBOX", "1") != "0"
+# admission/bill numbers reserved per counter transaction. 1 (default) keeps them
+# gap-free; a larger block lets a campus on a flaky link register without a
+# round trip per student, and numbers left unused at a restart are skipped
+ADMISSION_BLOCK = int(os.environ.get("WISDOM_ADMISSION_BLOCK", "1"))
+
+def counters_ref():
+    """metadata/counters holds the last issued admission, bill and receipt numbers.
+
+    last_receipt_no is advanced a block at a time by receipt_numbers(), or inside
+    each payment transaction in gap-free mode (see firebase/receipt_numbers.py).
+    """
+    return get_db().collection("metadata").document("counters")
+
+# ─── Counters ────────────────────────────────────────────────────────────────────
+def _seed_counters():
+    """One-off: derive the starting counters from existing students."""
+    db = get_db()
+    last_adm = ADM_START - 1
+    for doc in db.collection("students").select(["__name__"]).stream():   # ids only
+        if doc.id.isdigit():
+            last_adm = max(last_adm, int(doc.id))
+    last_bill = BILL_START - 1
+    docs = db.collection("students") \
+             .order_by("bill_no", direction=firestore.Query.DESCENDING) \
+             .limit(1).stream()
+    last = next(docs, None)
+    if last:
+        try:
+            last_bill = max(last_bill, int(last.to_dict().get("bill_no")))
+        except (TypeError, ValueError):
+            pass
+    return last_adm, last_bill
+
+def allocate_number_block(count):
+    """Atomically reserve `count` consecutive admission and bill numbers.
+
+    Returns the first (admission_no, bill_no) of the block as ints; bulk import
+    takes one block per write chunk instead of one transaction per student.
+    """
+    db = get_db()
+    counter_doc = counters_ref()
+    transaction = db.transaction()
+
+    @firestore.transactional
+    def _incr(txn):
+        counters  = counter_doc.get(transaction=txn).to_dict() or {}
+        last_adm  = counters.get("last_admission_no")
+        last_bill = counters.get("last_bill_no")
+        if last_adm is None or last_bill is None:
+            seed_adm, seed_bill = _seed_counters()
+            last_adm  = seed_adm if last_adm is None else last_adm
+            last_bill = seed_bill if last_bill is None else last_bill
+        txn.set(counter_doc, {
+            "last_admission_no": int(last_adm) + count,
+            "last_bill_no":      int(last_bill) + count,
+        }, merge=True)
+        return int(last_adm) + 1, int(last_bill) + 1
+
+    return _incr(transaction)
+
+def format_adm_no(n):
+    return f"{n:04d}"
+
+@st.cache_resource(show_spinner=False)
+def admission_numbers():
+    """This process's admission numbers, ADMISSION_BLOCK at a time.
+
+    A ReceiptNumberBlock over allocate_number_block(); .bills maps the first
+    admission number of each block to its first bill number.
+    """
+    bills = {}
+
+    def reserve(size):
+        adm, bill = allocate_number_block(size)
+        bills[adm] = bill
+        return adm
+
+    block = ReceiptNumberBlock(get_db(), counters_ref(), size=ADMISSION_BLOCK,
+                               stats=transaction_stats(), reserve=reserve)
+    block.bills = bills
+    return block
+
+def allocate_adm_and_bill_no():
+    """Take the next admission_no and bill_no; call only on submit.
+
+    Both counters advance together, so the bill number is the block's first
+    bill plus the admission number's offset in the block.
+    """
+    block = admission_numbers()
+    adm = block.take()
+    first = max(a for a in list(block.bills) if a <= adm)
+    return format_adm_no(adm), str(block.bills[first] + adm - first)
+
+# ─── Receipt numbers ─────────────────────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def transaction_stats():
+    """Process-wide attempt / retry counters for the counter and payment transactions."""
+    return TransactionStats()
+
+@st.cache_resource(show_spinner=False)
+def receipt_numbers():
+    """This process's block of receipt numbers (WISDOM_RECEIPT_MODE=block)."""
+    return ReceiptNumberBlock(get_db(), counters_ref(), stats=transaction_stats())
+
+# ─── Local replica ───────────────────────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def _replica_sync():
+    return ReplicaSync(get_db(), Replica(), overlay=_pending_overlay)
+
+def replica():
+    """The process's SQLite replica (firebase/replica.py), listeners (re)started.
+
+    None when WISDOM_REPLICA=0.
+    """
+    if not REPLICA_ENABLED:
+        return None
+    sync = _replica_sync()
+    sync.start()
+    return sync.replica
+
+def _replica_for(table):
+    """The replica if `table` has synced at least once, else None (read Firestore)."""
+    rep = replica()
+    return rep if rep is not None and rep.ready(table) else None
+
+_memo = {}
+
+def _memoized(rep, table, name, build):
+    """build() once per change of the replica's `table`; shared by all sessions.
+
+    The version is read before building, so a write that lands meanwhile
+    makes the next call rebuild rather than keep a stale value.
+    """
+    version = (id(rep), rep.version(table))
+    hit = _memo.get(name)
+    if hit is not None and hit[0] == version:
+        return hit[1]
+    value = build()
+    _memo[name] = (version, value)
+    return value
+
+def replica_write(table, doc_id, fields, parent=None, merge=False):
+    """Copy a write the app just committed, so the next read sees it before
+    the listener does."""
+    rep = replica()
+    if rep is None:
+        return
+    if merge:
+        rep.patch(table, doc_id, fields)
+    else:
+        rep.put(table, doc_id, fields, parent)
+
+# ─── Payments ────────────────────────────────────────────────────────────────────
+MAX_BATCH = 200   # 2 writes per payment; a transaction allows 500
+
+class PaymentRejected(ValueError):
+    """A payment Firestore can never accept (student missing, amount over the balance).
+
+    Retrying will not help, unlike the ValueError @firestore.transactional
+    raises once every commit attempt was aborted by contention.
+    """
+
+def _payment_update(student, amount, next_due):
+    """Student fields after paying `amount`; fee_due_date only if the doc tracks it."""
+    update = {
+        "paid": (student.get("paid", 0) or 0) + amount,
+        "balance": (student.get("balance", 0) or 0) - amount,
+    }
+    if "fee_due_date" in student:
+        update["fee_due_date"] = next_due
+    return update
+
+def _receipt_doc(amount, receipt_no, timestamp, mode, next_due, remarks):
+    return {
+        "amount": amount,
+        "timestamp": timestamp,
+        "mode": mode,
+        "next_due": next_due,
+        "receipt_no": receipt_no,
+        "remarks": remarks,
+        "pdf_path": os.path.join(RECEIPT_DIR, receipt_pdf_name(receipt_no)),
+    }
+
+def process_payments(payments, mode, next_due, remarks, receipt_nos=None, receipt_ids=None,
+                     timestamp=None):
+    """Update the balances and write the receipt docs of several students in
+    ONE transaction: either every payment is recorded or none is.
+
+    `payments` is a list of (student_ref, amount). In gap-free mode the
+    receipt numbers are allocated in the same transaction, so a failure never
+    burns a number; in block mode they come from this process's reserved
+    block and are handed back whenever the transaction fails before its
+    commit was sent, or its commit was aborted. Only a commit that errors
+    without a clear outcome (timeout, dropped connection) keeps its numbers,
+    since it may have been applied; those show up as gaps.
+
+    The outbox passes the receipt numbers it already printed plus fixed
+    receipt_ids; if those receipts exist the payment was applied by an earlier
+    attempt and None is returned.
+
+    Returns [(receipt_no, new_paid, new_balance)] in the order given.
+    """
+    queued = receipt_nos is not None
+    gapless = RECEIPT_MODE == "gapless" and not queued
+    counter_doc = counters_ref()
+    receipt_refs = [ref.collection("receipts").document(rid)
+                    for (ref, _), rid in zip(payments, receipt_ids or [None] * len(payments))]
+    stats = transaction_stats()
+    if queued:
+        block_nos = list(receipt_nos)
+    else:
+        block_nos = [] if gapless else [receipt_numbers().take() for _ in payments]
+    timestamp = timestamp or datetime.now().isoformat()
+
+    @firestore.transactional
+    def _transaction(txn):
+        stats.attempt("payment")
+        attempt["committing"] = False
+        # all reads first, in a single round trip
+        student_refs = [ref for ref, _ in payments]
+        refs = ([counter_doc] if gapless else []) + student_refs + (receipt_refs if queued else [])
+        snaps = {s.reference.path: s for s in txn.get_all(refs)}
+        if queued and snaps[receipt_refs[0].path].exists:
+            return None
+        if gapless:
+            counters = snaps[counter_doc.path].to_dict() or {}
+            last_no = int(counters.get("last_receipt_no") or RECEIPT_START)
+            receipt_nos = [last_no + i for i in range(1, len(payments) + 1)]
+            txn.set(counter_doc, {"last_receipt_no": receipt_nos[-1]}, merge=True)
+        else:
+            receipt_nos = block_nos
+
+        results = []
+        local_writes.clear()   # the function reruns on every attempt
+        for (student_ref, amount), receipt_ref, receipt_no in zip(payments, receipt_refs, receipt_nos):
+            student_data = snaps[student_ref.path].to_dict()
+            if student_data is None:
+                raise PaymentRejected(f"Student record {student_ref.id} not found")
+
+            if amount > student_data.get("balance", 0):
+                raise PaymentRejected(
+                    f"Payment amount exceeds current balance for {student_ref.id}"
+                )
+
+            update_data = _payment_update(student_data, amount, next_due.isoformat())
+            new_paid, new_balance = update_data["paid"], update_data["balance"]
+            receipt = _receipt_doc(amount, receipt_no, timestamp, mode,
+                                   next_due.isoformat(), remarks)
+            txn.update(student_ref, update_data)
+            txn.set(receipt_ref, receipt)
+            local_writes.append((student_ref.id, update_data, receipt_ref.path, receipt))
+            results.append((receipt_no, new_paid, new_balance))
+        attempt["committing"] = True   # the commit follows this return
+        return results
+
+    local_writes = []
+    attempt = {"committing": False}
+    try:
+        results = stats.run("payment", _transaction, get_db().transaction())
+    except Exception as e:
+        # never committed, so the numbers were never used (ValueError is also
+        # what @transactional raises once every commit attempt was aborted);
+        # a queued payment's receipt is already printed and keeps its number
+        definitely_not_committed = isinstance(e, (exceptions.Aborted, ValueError))
+        if not queued and (not attempt["committing"] or definitely_not_committed):
+            for n in block_nos:
+                receipt_numbers().give_back(n)
+        raise
+    if not queued:       # queued payments reached the replica when recorded
+        for adm, update_data, receipt_path, receipt in local_writes:
+            replica_write("students", adm, update_data, merge=True)
+            replica_write("receipts", receipt_path, receipt, parent=adm)
+    return results
+
+def process_payment(student_ref, amount, mode, next_due, remarks):
+    """Single-student payment; returns (receipt_no, new_paid, new_balance)."""
+    return process_payments([(student_ref, amount)], mode, next_due, remarks)[0]
+
+def payments_queued():
+    """True when record_payments() queues in the outbox instead of committing."""
+    return OUTBOX_ENABLED and RECEIPT_MODE != "gapless"
+
+def record_payments(rows, mode, next_due, remarks):
+    """Record [(student dict, amount)] through the outbox; same result as
+    process_payments().
+
+    Balances are checked against the given student docs and the receipt
+    numbers come from the local block, so the clerk never waits on Firestore.
+    The outbox commits the batch as one transaction later; gap-free numbering
+    needs the counter in that transaction, so it (and WISDOM_OUTBOX=0) still
+    writes directly.
+    """
+    if not payments_queued():
+        db = get_db()
+        return process_payments(
+            [(db.collection("students").document(s.get("admission_no", "")), a) for s, a in rows],
+            mode, next_due, remarks,
+        )
+    for s, amount in rows:
+        if amount > (s.get("balance", 0) or 0):
+            raise PaymentRejected(
+                f"Payment amount exceeds current balance for {s.get('admission_no')}")
+    receipt_nos = [receipt_numbers().take() for _ in rows]
+    key = uuid.uuid4().hex
+    timestamp = datetime.now().isoformat()
+    results = []
+    for i, ((s, amount), receipt_no) in enumerate(zip(rows, receipt_nos)):
+        adm = s.get("admission_no", "")
+        update = _payment_update(s, amount, next_due.isoformat())
+        replica_write("students", adm, update, merge=True)
+        replica_write("receipts", f"students/{adm}/receipts/{key}-{i}",
+                      _receipt_doc(amount, receipt_no, timestamp, mode,
+                                   next_due.isoformat(), remarks), parent=adm)
+        results.append((receipt_no, update["paid"], update["balance"]))
+    outbox().add("payment", {
+        "payments": [[s.get("admission_no", ""), a] for s, a in rows],
+        "receipt_nos": receipt_nos, "mode": mode, "next_due": next_due.isoformat(),
+        "remarks": remarks, "timestamp": timestamp,
+    }, key=key)
+    return results
+
+def record_payment(student, amount, mode, next_due, remarks):
+    """Single-student record_payments(); returns (receipt_no, new_paid, new_balance)."""
+    return record_payments([(student, amount)], mode, next_due, remarks)[0]
+
+# ─── Receipts ────────────────────────────────────────────────────────────────────
+def load_receipt_index():
+    """Map admission_no -> list of receipt dicts, newest first."""
+    rep = _replica_for("receipts")
+    if rep is not None:
+        return _memoized(rep, "receipts", "receipt_index", rep.receipt_index)
+    return _fetch_receipt_index()
+
+@st.cache_data(ttl=300, show_spinner="Fetching receipts...")
+def _fetch_receipt_index():
+    """load_receipt_index() from one collection-group query (no replica yet)."""
+    index = {}
+    for doc in get_db().collection_group("receipts").stream():
+        student_ref = doc.reference.parent.parent
+        if student_ref is None or student_ref.parent.id != "students":
+            continue
+        index.setdefault(student_ref.id, []).append(doc.to_dict())
+    for receipts in index.values():
+        receipts.sort(key=lambda r: r.get("timestamp", ""), reverse=True)
+    return index
+
+def _clear_receipt_index():
+    _memo.pop("receipt_index", None)
+    _fetch_receipt_index.clear()
+
+load_receipt_index.clear = _clear_receipt_index   # pages clear it after a payment
+
+# ─── Due students ────────────────────────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def due_students_view():
+    """Live, process-wide view of `students where balance > 0`.
+
+    One snapshot listener per app process replaces per-session TTL polling;
+    payments made from any session show up as soon as Firestore reports them.
+    Until the listener has connected (offline start-up) the replica answers.
+    """
+    return LiveQueryView(get_db().collection("students").where("balance", ">", 0),
+                         fallback=_replica_due_students)
+
+def _replica_due_students():
+    rep = _replica_for("students")
+    return None if rep is None else rep.select("students", "balance > 0")
+
+def load_due_students():
+    """Students with a balance, ordered by admission_no.
+
+    Payments still in the outbox are applied on top of Firestore's view, so
+    a queued payment is not collected twice (the replica already has them).
+    """
+    rows, local = due_students_view().snapshot()
+    if local:
+        return sorted(rows, key=lambda s: str(s.get("admission_no", "")))
+    queued = {}
+    for adm, amount in _queued_payments():
+        queued[adm] = queued.get(adm, 0) + amount
+    students = []
+    for s in rows:
+        amount = queued.get(s.get("admission_no"))
+        if amount:
+            s = dict(s, paid=(s.get("paid", 0) or 0) + amount,
+                     balance=(s.get("balance", 0) or 0) - amount)
+            if s["balance"] <= 0:
+                continue
+        students.append(s)
+    return sorted(students, key=lambda s: str(s.get("admission_no", "")))
+
+# ─── Students list ───────────────────────────────────────────────────────────────
+def students_query(fclass="All", fsect="All", fstat="All"):
+    """Build the Firestore query for the filters; returns (query, order_fields).
+
+    Every combination is backed by an index in firestore.indexes.json.
+    """
+    q = get_db().collection("students")
+    if fclass != "All":
+        q = q.where("class", "==", fclass)
+    if fsect != "All":
+        q = q.where("section", "==", fsect)
+    order = ["admission_no"]
+    if fstat == "Paid":
+        q = q.where("balance", "==", 0)
+    elif fstat == "Due":
+        q = q.where("balance", ">", 0)
+        order = ["balance", "admission_no"]   # inequality field must be ordered first
+    for field in order:
+        q = q.order_by(field)
+    return q, order
+
+def load_students(q):
+    """Fetch every student matching the query as a list of dicts."""
+    return [doc.to_dict() for doc in q.stream()]
+
+def all_students():
+    """Every student, from the replica when it has synced."""
+    rep = _replica_for("students")
+    if rep is not None:
+        return rep.select("students", order="admission_no")
+    return load_students(get_db().collection("students"))
+
+def replica_students_page(fclass="All", fsect="All", fstat="All", page_size=50, page_no=0):
+    """(rows, has_next) of one list page from the replica, or None if it has not synced."""
+    rep = _replica_for("students")
+    if rep is None:
+        return None
+    return rep.students_page(fclass, fsect, fstat, page_size, page_no)
+
+def load_students_page(q, order, page_size, start_after=None):
+    """Fetch one page of the query.
+
+    Returns (rows, has_next, cursor); one extra doc is read to know if a next
+    page exists, and cursor holds the order_fields values of the last row.
+    """
+    if start_after is not None:
+        q = q.start_after(start_after)
+    rows = [doc.to_dict() for doc in q.limit(page_size + 1).stream()]
+    rows, has_next = rows[:page_size], len(rows) > page_size
+    cursor = {f: rows[-1].get(f) for f in order} if rows else None
+    return rows, has_next, cursor
+
+# ─── Roster ──────────────────────────────────────────────────────────────────────
+ROSTER_FIELDS = ["name", "admission_no", "class", "section"]
+
+def load_roster():
+    """name / admission_no / class / section of every student."""
+    rep = _replica_for("students")
+    if rep is not None:
+        return _memoized(rep, "students", "roster",
+                         lambda: rep.columns("students", ROSTER_FIELDS, order="admission_no"))
+    return _fetch_roster()
+
+@st.cache_data(show_spinner=False)
+def _fetch_roster():
+    """load_roster() as a field projection (no replica yet).
+
+    Shared by all sessions; REGISTER_STUDENT clears it after a registration.
+    """
+    docs = get_db().collection("students").select(ROSTER_FIELDS).stream()
+    return [doc.to_dict() for doc in docs]
+
+def _clear_roster():
+    _memo.pop("roster", None)
+    _fetch_roster.clear()
+
+load_roster.clear = _clear_roster
+
+# ─── Student search ──────────────────────────────────────────────────────────────
+@st.cache_resource(ttl=600, show_spinner="Building student search index...")
+def student_search_index():
+    """Process-wide name / admission no / mobile index over all students.
+
+    Built from the replica (or one read of the students); pages that write
+    students call upsert() so new registrations and payments show up without
+    a rebuild.
+    """
+    index = SearchIndex(
+        key="admission_no",
+        text_fields=("name",),
+        exact_fields=("admission_no",),
+        phone_fields=("father_mobile", "mother_mobile"),
+    )
+    for student in all_students():
+        index.upsert(student)
+    return index
+
+# ─── Enquiry & visitor search ────────────────────────────────────────────────────
+ENQUIRY_SEARCH_FIELDS = ["name", "mobile"]
+VISITOR_SEARCH_FIELDS = ["name", "mobile", "purpose"]
+
+def _search_rows(collection, fields):
+    """{id, fields...} of every document, from the replica or one projected read."""
+    rep = _replica_for(collection)
+    if rep is not None:
+        docs = rep.select_with_ids(collection)
+    else:
+        docs = ((d.id, d.to_dict()) for d in
+                get_db().collection(collection).select(fields).stream())
+    return [dict({f: doc.get(f) for f in fields}, id=doc_id) for doc_id, doc in docs]
+
+@st.cache_resource(ttl=600, show_spinner="Building enquiry search index...")
+def enquiry_search_index():
+    """Process-wide name / mobile index over all enquiries, keyed by doc id.
+
+    MANAGE_ENQUIRIES calls index_enquiry() after its writes.
+    """
+    index = SearchIndex(key="id", text_fields=("name",), phone_fields=("mobile",))
+    for rec in _search_rows("enquiries", ENQUIRY_SEARCH_FIELDS):
+        index.upsert(rec)
+    return index
+
+@st.cache_resource(ttl=600, show_spinner="Building visitor search index...")
+def visitor_search_index():
+    """Process-wide name / purpose / mobile index over all visitors, keyed by doc id.
+
+    MANAGE_VISITORS calls index_visitor() after its writes.
+    """
+    index = SearchIndex(key="id", text_fields=("name", "purpose"), phone_fields=("mobile",))
+    for rec in _search_rows("visitors", VISITOR_SEARCH_FIELDS):
+        index.upsert(rec)
+    return index
+
+def _index_merge(index, fields, doc_id, data):
+    rec = dict(index.get(doc_id) or {"id": doc_id})
+    rec.update({f: data[f] for f in fields if f in data})
+    index.upsert(rec)
+
+def index_enquiry(doc_id, data):
+    """Upsert the searchable fields of a written enquiry (partial data is merged)."""
+    _index_merge(enquiry_search_index(), ENQUIRY_SEARCH_FIELDS, doc_id, data)
+
+def index_visitor(doc_id, data):
+    """Upsert the searchable fields of a written visitor (partial data is merged)."""
+    _index_merge(visitor_search_index(), VISITOR_SEARCH_FIELDS, doc_id, data)
+
+# ─── Enquiries ───────────────────────────────────────────────────────────────────
+def fetch_enquiries():
+    rep = _replica_for("enquiries")
+    if rep is not None:
+        docs = rep.select_with_ids("enquiries", order="inquiry_date DESC")
+    else:
+        docs = (
+            (d.id, d.to_dict()) for d in
+            get_db().collection("enquiries")
+              .order_by("inquiry_date", direction=firestore.Query.DESCENDING)
+              .stream()
+        )
+    rows = []
+    for doc_id, e in docs:
+        e["id"] = doc_id
+        # follow‑up counter is kept on the enquiry doc by add_followup()
+        e.setdefault("follow_up_count", 0)
+        rows.append(e)
+    return pd.DataFrame(rows)
+
+# ─── Visitors ────────────────────────────────────────────────────────────────────
+def load_visitors(first, nxt):
+    """[(doc_id, visitor)] for visit days first <= day < nxt, ordered by time_in.
+
+    Firestore: a single day is one equality query on the visit_date bucket
+    (index: visit_date + time_in), longer periods a range on time_in.
+    """
+    rep = _replica_for("visitors")
+    if rep is not None:
+        return rep.select_with_ids("visitors", "visit_date >= ? AND visit_date < ?",
+                                   (first.isoformat(), nxt.isoformat()), "time_in")
+    q = get_db().collection("visitors")
+    if nxt - first == timedelta(days=1):
+        q = q.where("visit_date", "==", first.isoformat())
+    else:
+        q = q.where("time_in", ">=", start_of_day(first)).where("time_in", "<", start_of_day(nxt))
+    return [(d.id, d.to_dict()) for d in q.order_by("time_in").stream()]
+
+# ─── Outbox ──────────────────────────────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def outbox():
+    """The process's write-behind journal (firebase/outbox.py), flusher running."""
+    box = Outbox()
+    box.start(_flush_outbox)
+    return box
+
+def queue_writes(writes):
+    """Commit [(path, data, merge)] document writes through the outbox.
+
+    Applies them to the replica at once; with WISDOM_OUTBOX=0 they are written
+    straight to Firestore instead. Returns the entry key (None when direct).
+    """
+    db = get_db()
+    for path, data, merge in writes:
+        col, _, doc_id = path.rpartition("/")
+        replica_write(col, doc_id, data, merge=merge)
+    if not OUTBOX_ENABLED:
+        batch = db.batch()
+        for path, data, merge in writes:
+            batch.set(db.document(path), data, merge=merge)
+        batch.commit()
+        return None
+    return outbox().add("writes", [[path, data, merge] for path, data, merge in writes])
+
+def new_doc_id(collection):
+    """Auto-id for a document queued before Firestore has seen it."""
+    return get_db().collection(collection).document().id
+
+def _queued_payments():
+    """[(admission_no, amount)] of payments still waiting in the outbox."""
+    if not OUTBOX_ENABLED:
+        return []
+    return [(adm, amount) for _, _, p in outbox().pending("payment")
+            for adm, amount in p["payments"]]
+
+def queued_paths():
+    """Document paths with writes still waiting in the outbox."""
+    if not OUTBOX_ENABLED:
+        return set()
+    return {w[0] for _, _, writes in outbox().pending("writes") for w in writes}
+
+def _restore_replica(payments, key):
+    """Undo the local copy of a queued payment that Firestore rejected."""
+    rep = replica()
+    if rep is None:
+        return
+    rep.apply("receipts", deletes=[f"{ref.path}/receipts/{key}-{n}"
+                                   for n, (ref, _) in enumerate(payments)])
+    for ref, _ in payments:
+        student = ref.get().to_dict()
+        if student is not None:
+            rep.put("students", ref.id, student)
+
+def _pending_overlay(table, upserts):
+    """Lay outbox entries that are still pending over a full snapshot of
+    `table`, so a listener (re)start does not wipe writes Firestore has not
+    seen yet. Same effect as the write-through in queue_writes() / record_payments()."""
+    if not OUTBOX_ENABLED:
+        return upserts
+    docs = {doc_id: (doc, parent) for doc_id, doc, parent in upserts}
+    for key, kind, payload in outbox().pending():
+        if kind == "writes":
+            for path, fields, merge in payload:
+                col, _, doc_id = path.rpartition("/")
+                if col != table:
+                    continue
+                if not merge:
+                    docs[doc_id] = (fields, None)
+                elif doc_id in docs:
+                    doc, parent = docs[doc_id]
+                    docs[doc_id] = (dict(doc, **fields), parent)
+            continue
+        for i, ((adm, amount), receipt_no) in enumerate(zip(payload["payments"],
+                                                             payload["receipt_nos"])):
+            if table == "students" and adm in docs:
+                doc, parent = docs[adm]
+                docs[adm] = (dict(doc, **_payment_update(doc, amount, payload["next_due"])), parent)
+            elif table == "receipts":
+                docs[f"students/{adm}/receipts/{key}-{i}"] = (_receipt_doc(
+                    amount, receipt_no, payload["timestamp"], payload["mode"],
+                    payload["next_due"], payload["remarks"]), adm)
+    return [(doc_id, doc, parent) for doc_id, (doc, parent) in docs.items()]
+
+def _flush_outbox(box, limit=500):
+    """Commit pending entries in order: runs of plain writes as one batch
+    (at most 500 writes), each payment as its own transaction."""
+    db = get_db()
+    entries = box.pending(limit=limit)
+    i = 0
+    while i < len(entries):
+        key, kind, payload = entries[i]
+        if kind == "payment":
+            payments = [(db.collection("students").document(adm), amount)
+                        for adm, amount in payload["payments"]]
+            try:
+                process_payments(
+                    payments, payload["mode"], date.fromisoformat(payload["next_due"]),
+                    payload["remarks"], receipt_nos=payload["receipt_nos"],
+                    receipt_ids=[f"{key}-{n}" for n in range(len(payments))],
+                    timestamp=payload["timestamp"],
+                )
+            except PaymentRejected as e:   # contention / offline: raise, retry later
+                box.mark_failed(key, e)
+                _restore_replica(payments, key)
+            else:
+                box.mark_synced([key])
+            i += 1
+            continue
+        batch, keys, n = db.batch(), [], 0
+        while i < len(entries) and entries[i][1] == "writes" and n + len(entries[i][2]) <= 500:
+            for path, data, merge in entries[i][2]:
+                batch.set(db.document(path), data, merge=merge)
+            keys.append(entries[i][0])
+            n += len(entries[i][2])
+            i += 1
+        if not keys:   # one entry larger than a batch; never produced by the pages
+            box.mark_failed(entries[i][0], "more than 500 writes in one entry")
+            i += 1
+            continue
+        batch.commit()
+        box.mark_synced(keys)
+
+SYNC_STATUS_EVERY = 5   # seconds between refreshes of the sidebar line
+
+def show_sync_status():
+    """Sidebar line: writes waiting in the outbox, failures, or all synced.
+
+    Refreshes on its own, so a queued write is seen going through.
+    """
+    if not OUTBOX_ENABLED:
+        return
+    with st.sidebar:
+        _sync_status()
+
+@st.fragment(run_every=SYNC_STATUS_EVERY)
+def _sync_status():
+    stat = outbox().status()
+    if stat["failed"]:
+        with st.expander(f"⚠️ {stat['failed']} change(s) rejected by Firestore"):
+            for created, kind, error in stat["failures"]:
+                st.caption(f"{created[:16]} · {kind}: {error}")
+    if stat["pending"]:
+        msg = f"⏳ {stat['pending']} change(s) waiting to sync"
+        if stat["last_error"]:
+            msg += f" — {stat['last_error']}"
+        st.caption(msg)
+    else:
+        st.caption("✅ All changes synced")
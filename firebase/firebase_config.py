@@ -1,14 +1,48 @@
+import os
+
 import firebase_admin
+import streamlit as st
 from firebase_admin import credentials, auth, firestore
+from google.cloud import firestore as gcf
+
+from firebase.instrumentation import instrument
 
-# Point to your service account
-SERVICE_ACCOUNT = r"D:\wisdom\wisdom-schools-firebase-adminsdk-fbsvc-971bbaec20.json"
+# Point to your service account (override with WISDOM_FIREBASE_CREDENTIALS)
+SERVICE_ACCOUNT = os.environ.get(
+    "WISDOM_FIREBASE_CREDENTIALS",
+    r"D:\wisdom\wisdom-schools-firebase-adminsdk-fbsvc-971bbaec20.json"
+)
+PROJECT_ID = os.environ.get("WISDOM_FIREBASE_PROJECT", "wisdom-schools")
+# Set by `firebase emulators:start`, e.g. "localhost:8080"
+EMULATOR_HOST = os.environ.get("FIRESTORE_EMULATOR_HOST")
+# "memory" swaps Firestore for the in-process fake in firebase/memory_store.py
+BACKEND = os.environ.get("WISDOM_FIRESTORE_BACKEND", "firestore")
+# Count reads/writes per page (firebase/instrumentation.py); "0" for the bare client
+METRICS = os.environ.get("WISDOM_FIRESTORE_METRICS", "1") != "0"
 
-# Initialize (idempotent)
-if not firebase_admin._apps:
-    cred = credentials.Certificate(SERVICE_ACCOUNT)
-    firebase_admin.initialize_app(cred)
+def _make_client():
+    if BACKEND == "memory":
+        from firebase.memory_store import MemoryClient
+        return MemoryClient(project=PROJECT_ID)
+    if EMULATOR_HOST:
+        # google-cloud-firestore talks to the emulator without a key
+        return gcf.Client(project=PROJECT_ID)
+    # Initialize (idempotent)
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(SERVICE_ACCOUNT)
+        firebase_admin.initialize_app(cred, {"projectId": PROJECT_ID})
+    return firestore.client()
 
-# Expose clients
-db = firestore.client()
+@st.cache_resource(show_spinner=False)
+def get_db():
+    """Return the process-wide Firestore client, created on first use."""
+    client = _make_client()
+    return instrument(client) if METRICS else client
+
+# Expose clients (`db` is created lazily on first access)
 admin_auth = auth
+
+def __getattr__(name):
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
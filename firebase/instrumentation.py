@@ -0,0 +1,370 @@
+# firebase/instrumentation.py
+# Counts what every page costs in Firestore: document reads, writes, queries,
+# approximate bytes and time spent waiting on Firestore.
+#
+# get_db() hands out the client wrapped in thin proxies (set
+# WISDOM_FIRESTORE_METRICS=0 to get the bare client). Usage is charged to the
+# page run that is active on the calling thread (see track_page()); listener
+# callbacks and other threads land in a process-wide "background" bucket.
+#
+#   WISDOM_FIRESTORE_DEBUG=1   show the usage panel in the sidebar
+#   WISDOM_FIRESTORE_LOG=path  JSONL file, one line per page run ("" disables)
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import streamlit as st
+
+DEBUG_PANEL = os.environ.get("WISDOM_FIRESTORE_DEBUG", "") not in ("", "0")
+LOG_PATH = os.environ.get("WISDOM_FIRESTORE_LOG", "D:/wisdom/logs/firestore_usage.jsonl")
+
+_COUNTERS = ("reads", "writes", "queries", "bytes")
+
+def _blank_usage():
+    return {"reads": 0, "writes": 0, "queries": 0, "bytes": 0,
+            "firestore_ms": 0.0, "targets": {}}
+
+def _merge(into, usage):
+    for k in _COUNTERS + ("firestore_ms",):
+        into[k] += usage[k]
+    for target, row in usage["targets"].items():
+        dst = into["targets"].setdefault(target, {"calls": 0, "reads": 0, "writes": 0})
+        for k in dst:
+            dst[k] += row[k]
+
+_lock = threading.Lock()
+_local = threading.local()
+_background = _blank_usage()
+_page_totals = {}   # page -> usage summed over runs, plus "runs"
+
+def record(target, reads=0, writes=0, queries=0, nbytes=0, seconds=0.0):
+    """Charge one Firestore call to the current page run (or to background)."""
+    run = getattr(_local, "run", None)
+    with _lock:
+        usage = run.usage if run is not None else _background
+        usage["reads"] += reads
+        usage["writes"] += writes
+        usage["queries"] += queries
+        usage["bytes"] += nbytes
+        usage["firestore_ms"] += seconds * 1000
+        row = usage["targets"].setdefault(target, {"calls": 0, "reads": 0, "writes": 0})
+        row["calls"] += 1
+        row["reads"] += reads
+        row["writes"] += writes
+
+# ─── Sizes and targets ───────────────────────────────────────────────────────────
+def _value_size(v):
+    # Firestore storage-size rules, roughly: strings len+1, numbers/timestamps 8
+    if v is None or isinstance(v, bool):
+        return 1
+    if isinstance(v, str):
+        return len(v.encode("utf-8")) + 1
+    if isinstance(v, (bytes, bytearray)):
+        return len(v)
+    if isinstance(v, dict):
+        return sum(len(str(k)) + 1 + _value_size(x) for k, x in v.items())
+    if isinstance(v, (list, tuple)):
+        return sum(_value_size(x) for x in v)
+    return 8
+
+def _doc_size(snap):
+    data = getattr(snap, "_data", None)
+    if data is None and getattr(snap, "exists", False):
+        data = snap.to_dict()
+    return _value_size(data or {}) + 32
+
+def _target(obj):
+    """Collection path with document ids replaced by '*' ("students/*/receipts")."""
+    if getattr(obj, "_all_descendants", False):
+        return "**/" + obj._parent.id
+    path = getattr(obj, "_path", None)
+    if path is None and getattr(obj, "_parent", None) is not None:
+        path = obj._parent._path
+    if not path:
+        return "?"
+    return "/".join(seg if i % 2 == 0 else "*" for i, seg in enumerate(path))
+
+# ─── Proxies ─────────────────────────────────────────────────────────────────────
+def _unwrap(obj):
+    return obj._inner if isinstance(obj, _Proxy) else obj
+
+def _unwrap_all(args, kwargs):
+    args = [
+        [_unwrap(x) for x in a] if isinstance(a, (list, tuple)) else _unwrap(a)
+        for a in args
+    ]
+    return args, {k: _unwrap(v) for k, v in kwargs.items()}
+
+class _Proxy:
+    """Forwards everything to the wrapped object, unwrapping arguments and
+    wrapping returned Firestore objects so that nested calls are counted too."""
+
+    def __init__(self, inner):
+        object.__setattr__(self, "_inner", inner)
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if not callable(attr):
+            return _wrap(attr)
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            args, kwargs = _unwrap_all(args, kwargs)
+            return _wrap(attr(*args, **kwargs))
+        return call
+
+    def __setattr__(self, name, value):
+        setattr(self._inner, name, value)
+
+    def __eq__(self, other):
+        return self._inner == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._inner)
+
+    def __repr__(self):
+        return f"<instrumented {self._inner!r}>"
+
+    def _stream(self, it, target, query=False):
+        """Yield wrapped snapshots, counting reads and time spent in Firestore.
+
+        A query is billed at least one read, even when it matches nothing.
+        """
+        n, nbytes, seconds = 0, 0, 0.0
+        it = iter(it)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    snap = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    seconds += time.perf_counter() - start
+                n += 1
+                nbytes += _doc_size(snap)
+                yield _wrap(snap)
+        finally:
+            record(target, reads=max(n, 1) if query else n, queries=int(query),
+                   nbytes=nbytes, seconds=seconds)
+
+class _QueryProxy(_Proxy):
+    """CollectionReference, Query or CollectionGroup."""
+
+    def stream(self, *args, **kwargs):
+        args, kwargs = _unwrap_all(args, kwargs)
+        return self._stream(self._inner.stream(*args, **kwargs), _target(self._inner), query=True)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream(*args, **kwargs))
+
+    def add(self, document_data, *args, **kwargs):
+        start = time.perf_counter()
+        result = self._inner.add(document_data, *args, **kwargs)
+        record(_target(self._inner), writes=1, nbytes=_value_size(document_data),
+               seconds=time.perf_counter() - start)
+        return _wrap(result)
+
+    def on_snapshot(self, callback):
+        target = _target(self._inner)
+
+        def counted(snapshots, changes, read_time):
+            record(target, reads=len(changes))
+            return callback(snapshots, changes, read_time)
+        record(target, queries=1)
+        return self._inner.on_snapshot(counted)
+
+class _DocumentProxy(_Proxy):
+    def get(self, *args, **kwargs):
+        args, kwargs = _unwrap_all(args, kwargs)
+        start = time.perf_counter()
+        snap = self._inner.get(*args, **kwargs)
+        record(_target(self._inner), reads=1, nbytes=_doc_size(snap),
+               seconds=time.perf_counter() - start)
+        return _wrap(snap)
+
+    def _write(self, method, *args, **kwargs):
+        args, kwargs = _unwrap_all(args, kwargs)
+        start = time.perf_counter()
+        result = getattr(self._inner, method)(*args, **kwargs)
+        data = args[0] if args and isinstance(args[0], dict) else {}
+        record(_target(self._inner), writes=1, nbytes=_value_size(data),
+               seconds=time.perf_counter() - start)
+        return result
+
+    def set(self, *args, **kwargs):
+        return self._write("set", *args, **kwargs)
+
+    def create(self, *args, **kwargs):
+        return self._write("create", *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._write("update", *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._write("delete", *args, **kwargs)
+
+class _BatchProxy(_Proxy):
+    """WriteBatch: writes are counted when the batch commits."""
+
+    def _count_commit(self, commit, target="batch"):
+        writes = len(getattr(self._inner, "_write_pbs", ()) or ())
+        start = time.perf_counter()
+        result = commit()
+        record(target, writes=writes, seconds=time.perf_counter() - start)
+        return result
+
+    def commit(self, *args, **kwargs):
+        return self._count_commit(functools.partial(self._inner.commit, *args, **kwargs))
+
+class _TransactionProxy(_BatchProxy):
+    """Transaction; works with @firestore.transactional, which drives the
+    private _begin/_commit/_rollback methods through the proxy."""
+
+    def _commit(self):
+        return self._count_commit(self._inner._commit, "transaction")
+
+    def get_all(self, references, *args, **kwargs):
+        refs = [_unwrap(r) for r in references]
+        return list(self._stream(self._inner.get_all(refs, *args, **kwargs), "transaction"))
+
+    def get(self, ref_or_query, *args, **kwargs):
+        inner = _unwrap(ref_or_query)
+        return self._stream(self._inner.get(inner, *args, **kwargs), _target(inner),
+                            query=hasattr(inner, "stream"))
+
+class _ClientProxy(_Proxy):
+    def get_all(self, references, *args, **kwargs):
+        refs = [_unwrap(r) for r in references]
+        return self._stream(self._inner.get_all(refs, *args, **kwargs), "get_all")
+
+_KINDS = {}   # class -> proxy class (or None), decided once per class
+
+def _proxy_class(cls):
+    if hasattr(cls, "_begin") and hasattr(cls, "_commit"):
+        return _TransactionProxy
+    if hasattr(cls, "commit") and hasattr(cls, "set"):
+        return _BatchProxy
+    if hasattr(cls, "set") and hasattr(cls, "collection"):
+        return _DocumentProxy
+    if hasattr(cls, "stream"):
+        return _QueryProxy
+    if hasattr(cls, "to_dict") and hasattr(cls, "reference"):
+        return _Proxy   # snapshot: only .reference needs wrapping
+    return None
+
+def _wrap(obj):
+    if obj is None or isinstance(obj, (_Proxy, str, bytes, int, float, dict)):
+        return obj
+    if isinstance(obj, tuple):
+        return tuple(_wrap(x) for x in obj)
+    if isinstance(obj, list):
+        return [_wrap(x) for x in obj]
+    cls = type(obj)
+    if cls not in _KINDS:
+        _KINDS[cls] = _proxy_class(cls)
+    proxy = _KINDS[cls]
+    return proxy(obj) if proxy else obj
+
+def instrument(client):
+    """Wrap a Firestore client so that everything reached through it is counted."""
+    return _ClientProxy(client)
+
+# ─── Page runs ───────────────────────────────────────────────────────────────────
+class PageRun:
+    """Firestore usage of one script run of one page."""
+
+    def __init__(self, page):
+        self.page = page
+        self.usage = _blank_usage()
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self.finished = False
+        self.panel = st.sidebar.empty() if DEBUG_PANEL else None
+
+    def summary(self, complete):
+        out = {k: v for k, v in self.usage.items() if k != "targets"}
+        out["firestore_ms"] = round(out["firestore_ms"], 1)
+        return {
+            "ts": self.started_at.isoformat(timespec="seconds"),
+            "page": self.page,
+            "complete": complete,
+            "run_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            **out,
+            "targets": self.usage["targets"],
+        }
+
+    def finish(self, complete=True):
+        """Log this run and fill the debug panel; call at the end of the page."""
+        if self.finished:
+            return
+        self.finished = True
+        if getattr(_local, "run", None) is self:
+            _local.run = None
+        line = self.summary(complete)
+        with _lock:
+            totals = _page_totals.setdefault(self.page, dict(_blank_usage(), runs=0))
+            totals["runs"] += 1
+            _merge(totals, self.usage)
+        _append_log(line)
+        if self.panel is not None:
+            with self.panel.container():
+                _render_panel(line)
+
+def track_page(page):
+    """Start charging Firestore calls on this thread to `page`; returns the PageRun.
+
+    A run that never reached finish() (st.stop(), an exception) is logged as
+    incomplete when the session's next run starts.
+    """
+    previous = st.session_state.get("_firestore_run")
+    if previous is not None and not previous.finished:
+        previous.panel = None   # its sidebar slot belongs to the old run
+        previous.finish(complete=False)
+    run = PageRun(page)
+    st.session_state["_firestore_run"] = run
+    _local.run = run
+    return run
+
+def _append_log(line):
+    if not LOG_PATH:
+        return
+    try:
+        os.makedirs(os.path.dirname(LOG_PATH) or ".", exist_ok=True)
+        with open(LOG_PATH, "a", encoding="utf-8") as fp:
+            fp.write(json.dumps(line, default=str) + "\n")
+    except OSError:
+        pass   # metrics must never break a page
+
+def page_totals():
+    """{page: usage summed over the runs of this process}, plus 'background'."""
+    with _lock:
+        out = {page: dict(t, targets=dict(t["targets"])) for page, t in _page_totals.items()}
+        out["background"] = dict(_background, runs=0, targets=dict(_background["targets"]))
+    return out
+
+def _render_panel(line):
+    st.markdown("#### 🔧 Firestore usage")
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Reads", line["reads"])
+    c2.metric("Writes", line["writes"])
+    c3.metric("Queries", line["queries"])
+    st.caption(
+        f"{line['bytes'] / 1024:.1f} KB · Firestore {line['firestore_ms']:.0f} ms · "
+        f"run {line['run_ms']:.0f} ms"
+    )
+    if line["targets"]:
+        st.dataframe(
+            [{"target": t, **row} for t, row in
+             sorted(line["targets"].items(), key=lambda kv: -kv[1]["reads"])],
+            hide_index=True, use_container_width=True
+        )
+    with st.expander("Per page (this process)"):
+        st.dataframe([
+            {"page": page, "runs": t["runs"], "reads": t["reads"], "writes": t["writes"],
+             "reads/run": round(t["reads"] / t["runs"], 1) if t["runs"] else None}
+            for page, t in page_totals().items()
+        ], hide_index=True, use_container_width=True)
@@ -0,0 +1,70 @@
+# firebase/live.py
+# In-memory mirrors of Firestore queries, kept current by snapshot listeners.
+import threading
+
+def apply_changes(docs, changes):
+    """Apply on_snapshot DocumentChanges to a {doc_id: data} dict, in place."""
+    for change in changes:
+        doc_id = change.document.id
+        if change.type.name == "REMOVED":
+            docs.pop(doc_id, None)
+        else:  # ADDED / MODIFIED
+            docs[doc_id] = change.document.to_dict()
+    return docs
+
+class LiveQueryView:
+    """Process-wide view of a query's result set.
+
+    The listener thread applies add/modify/remove events incrementally;
+    readers get a snapshot copy without touching Firestore. fallback(), if
+    given, returns local rows (or None) to serve until the listener's first
+    snapshot arrives.
+    """
+
+    def __init__(self, query, fallback=None):
+        self._query = query
+        self._fallback = fallback
+        self._docs = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._watch = None
+        self._start()
+
+    def _start(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()   # a dead watch may still hold its thread
+        self._ready.clear()
+        with self._lock:
+            self._docs = {}
+        self._watch = self._query.on_snapshot(self._on_snapshot)
+
+    def _on_snapshot(self, snapshots, changes, read_time):
+        with self._lock:
+            apply_changes(self._docs, changes)
+        self._ready.set()
+
+    def snapshot(self, timeout=10.0):
+        """(documents, local): local is True when they came from fallback().
+
+        Restarts a listener that has died. Until its first snapshot arrives the
+        fallback's rows are returned at once; without them, waits up to
+        `timeout` seconds and then runs a one-off query.
+        """
+        if self._watch is not None and not self._watch.is_active:
+            self._start()
+        if not self._ready.is_set() and self._fallback is not None:
+            rows = self._fallback()
+            if rows is not None:
+                return rows, True
+        if not self._ready.wait(timeout):
+            return [doc.to_dict() for doc in self._query.stream()], False
+        with self._lock:
+            return list(self._docs.values()), False
+
+    def values(self, timeout=10.0):
+        """Current documents as a list of dicts (see snapshot())."""
+        return self.snapshot(timeout)[0]
+
+    def close(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
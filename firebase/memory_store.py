@@ -0,0 +1,616 @@
+# firebase/memory_store.py
+# In-memory stand-in for the Firestore client, selected with
+# WISDOM_FIRESTORE_BACKEND=memory. Covers what the pages and scripts use:
+# collections and subcollections, document get/set/update/delete, add(),
+# where / order_by / limit / select / start_after, collection_group,
+# batches, transactions (works with @firestore.transactional), on_snapshot,
+# and the Increment / ArrayUnion / ArrayRemove / SERVER_TIMESTAMP / DELETE_FIELD
+# transforms.
+#
+# Data lives for the life of the process; it is meant for benchmarks, load
+# probes and offline development, not as a database.
+import enum
+import itertools
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from google.api_core import exceptions
+from google.cloud.firestore_v1 import transforms
+
+ASCENDING  = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+class ChangeType(enum.Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+class DocumentChange:
+    def __init__(self, type, document):
+        self.type = type
+        self.document = document
+
+# ─── Values ──────────────────────────────────────────────────────────────────────
+def _clone(v):
+    if isinstance(v, dict):
+        return {k: _clone(x) for k, x in v.items()}
+    if isinstance(v, list):
+        return [_clone(x) for x in v]
+    return v
+
+def _type_rank(v):
+    # Firestore's cross-type ordering: null < bool < number < timestamp < string < bytes < array < map
+    if v is None:
+        return 0
+    if isinstance(v, bool):
+        return 1
+    if isinstance(v, (int, float)):
+        return 2
+    if isinstance(v, datetime):
+        return 3
+    if isinstance(v, str):
+        return 4
+    if isinstance(v, bytes):
+        return 5
+    if isinstance(v, list):
+        return 7
+    return 8
+
+def _key(v):
+    rank = _type_rank(v)
+    if rank == 3 and v.tzinfo is None:
+        v = v.replace(tzinfo=timezone.utc)
+    if rank == 7:
+        return (rank, tuple(_key(x) for x in v))
+    if rank == 8:
+        return (rank, tuple(sorted((k, _key(x)) for k, x in v.items())))
+    return (rank, v)
+
+_MISSING = object()
+
+def _get_field(data, path):
+    for part in path.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return _MISSING
+        data = data[part]
+    return data
+
+def _transformed(old, value):
+    """Value to store for `value` (which may be a transform) over `old`."""
+    if isinstance(value, transforms.Increment):
+        base = old if isinstance(old, (int, float)) and not isinstance(old, bool) else 0
+        return base + value.value
+    if isinstance(value, transforms.ArrayUnion):
+        cur = list(old) if isinstance(old, list) else []
+        return cur + [x for x in value.values if x not in cur]
+    if isinstance(value, transforms.ArrayRemove):
+        return [x for x in (old if isinstance(old, list) else []) if x not in value.values]
+    if value is transforms.SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    return _clone(value)
+
+def _put(data, key, value):
+    if value is transforms.DELETE_FIELD:
+        data.pop(key, None)
+    elif isinstance(value, dict):
+        if not isinstance(data.get(key), dict):
+            data[key] = {}
+        _merge_into(data[key], value)
+    else:
+        data[key] = _transformed(data.get(key), value)
+
+def _set_field(data, path, value):
+    """update()-style write: `path` is a dotted field path."""
+    parts = path.split(".")
+    for part in parts[:-1]:
+        if not isinstance(data.get(part), dict):
+            data[part] = {}
+        data = data[part]
+    if isinstance(value, dict):
+        data[parts[-1]] = {}   # update() replaces a map value as a whole
+    _put(data, parts[-1], value)
+
+def _merge_into(dst, src):
+    """set()-style write: keys are field names, nested maps are merged."""
+    for k, v in src.items():
+        _put(dst, k, v)
+
+def _compare(op, a, b):
+    if op == "==":
+        return _key(a) == _key(b)
+    if op == "!=":
+        return a is not None and _key(a) != _key(b)
+    if op == "in":
+        return any(_key(a) == _key(x) for x in b)
+    if op == "not-in":
+        return a is not None and all(_key(a) != _key(x) for x in b)
+    if op == "array-contains":
+        return isinstance(a, list) and any(_key(x) == _key(b) for x in a)
+    if op == "array-contains-any":
+        return isinstance(a, list) and any(_key(x) == _key(y) for x in a for y in b)
+    if _type_rank(a) != _type_rank(b):
+        return False   # range filters only match values of the same type
+    ka, kb = _key(a), _key(b)
+    return {"<": ka < kb, "<=": ka <= kb, ">": ka > kb, ">=": ka >= kb}[op]
+
+_INEQUALITY = {"<", "<=", ">", ">=", "!=", "not-in"}
+
+# ─── Store ───────────────────────────────────────────────────────────────────────
+class _Store:
+    """Documents by collection path, plus version numbers for transactions."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.collections = {}   # "students" / "students/0001/receipts" -> {doc_id: data}
+        self.versions = {}      # doc path -> int, bumped on every write
+        self.listeners = []
+        self.clock = itertools.count(1)
+
+    def read(self, path):
+        col, _, doc_id = path.rpartition("/")
+        with self.lock:
+            data = self.collections.get(col, {}).get(doc_id)
+            return (_clone(data) if data is not None else None), self.versions.get(path, 0)
+
+    def apply(self, writes):
+        """Apply [(op, path, data, merge)] atomically, then notify listeners."""
+        touched = []
+        with self.lock:
+            exists = {}   # existence of each path as of the write being checked
+            for op, path, _, _ in writes:
+                col, _, doc_id = path.rpartition("/")
+                if path not in exists:
+                    exists[path] = doc_id in self.collections.get(col, {})
+                if op == "create" and exists[path]:
+                    raise exceptions.Conflict(f"Document already exists: {path}")
+                if op == "update" and not exists[path]:
+                    raise exceptions.NotFound(f"No document to update: {path}")
+                exists[path] = op != "delete"
+            for op, path, data, merge in writes:
+                col, _, doc_id = path.rpartition("/")
+                docs = self.collections.setdefault(col, {})
+                before = docs.get(doc_id)
+                if op == "delete":
+                    docs.pop(doc_id, None)
+                    after = None
+                elif op == "update":
+                    after = _clone(before)
+                    for k, v in data.items():
+                        _set_field(after, k, v)
+                else:   # set / create; merge keeps the fields not mentioned
+                    after = _clone(before) if merge and before is not None else {}
+                    _merge_into(after, data)
+                if after is not None:
+                    docs[doc_id] = after
+                self.versions[path] = next(self.clock)
+                touched.append((col, doc_id, before, after))
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener.notify(touched)
+
+# ─── References and snapshots ────────────────────────────────────────────────────
+class DocumentSnapshot:
+    def __init__(self, reference, data, read_time=None):
+        self._reference = reference
+        self._data = data
+        self.read_time = read_time or datetime.now(timezone.utc)
+
+    @property
+    def reference(self):
+        return self._reference
+
+    @property
+    def id(self):
+        return self._reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return _clone(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        val = _get_field(self._data or {}, field_path)
+        if val is _MISSING:
+            raise KeyError(field_path)
+        return _clone(val)
+
+class DocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self._path = tuple(path.split("/"))
+        self.path = path
+        self.id = self._path[-1]
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    @property
+    def parent(self):
+        return CollectionReference(self._client, "/".join(self._path[:-1]))
+
+    def collection(self, collection_id):
+        return CollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def collections(self):
+        prefix = self.path + "/"
+        with self._client._store.lock:
+            names = [c for c in self._client._store.collections if c.startswith(prefix)
+                     and "/" not in c[len(prefix):]]
+        return [CollectionReference(self._client, c) for c in names]
+
+    def get(self, field_paths=None, transaction=None, **_):
+        if transaction is not None:
+            return next(iter(transaction.get_all([self])))
+        data, _ = self._client._store.read(self.path)
+        if data is not None and field_paths:
+            data = _project(data, field_paths)
+        return DocumentSnapshot(self, data)
+
+    def _write(self, op, data=None, merge=False):
+        self._client._store.apply([(op, self.path, data, merge)])
+        return datetime.now(timezone.utc)
+
+    def set(self, document_data, merge=False):
+        return self._write("set", document_data, merge)
+
+    def create(self, document_data):
+        return self._write("create", document_data)
+
+    def update(self, field_updates, option=None):
+        return self._write("update", field_updates)
+
+    def delete(self, option=None):
+        return self._write("delete")
+
+def _project(data, fields):
+    out = {}
+    for f in fields:
+        val = _get_field(data, f)
+        if val is not _MISSING:
+            _set_field(out, f, _clone(val))
+    return out
+
+class Query:
+    """Immutable query over one collection (or a collection group)."""
+
+    ASCENDING  = ASCENDING
+    DESCENDING = DESCENDING
+
+    def __init__(self, parent, all_descendants=False, filters=(), orders=(),
+                 limit=None, offset=0, projection=None, cursor=None):
+        self._parent = parent
+        self._client = parent._client
+        self._all_descendants = all_descendants
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._offset = offset
+        self._projection = projection
+        self._cursor = cursor   # (fields dict or DocumentSnapshot, inclusive) or None
+
+    def _copy(self, **kw):
+        args = dict(filters=self._filters, orders=self._orders, limit=self._limit,
+                    offset=self._offset, projection=self._projection, cursor=self._cursor)
+        args.update(kw)
+        return Query(self._parent, self._all_descendants, **args)
+
+    # ── builders ──
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def offset(self, num_to_skip):
+        return self._copy(offset=num_to_skip)
+
+    def select(self, field_paths):
+        return self._copy(projection=list(field_paths))
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(cursor=(document_fields_or_snapshot, False))
+
+    def start_at(self, document_fields_or_snapshot):
+        return self._copy(cursor=(document_fields_or_snapshot, True))
+
+    # ── evaluation ──
+    def _collections(self):
+        store = self._client._store
+        if not self._all_descendants:
+            return [(self._parent.path, store.collections.get(self._parent.path, {}))]
+        cid = self._parent.id
+        return [(p, docs) for p, docs in store.collections.items()
+                if p.rpartition("/")[2] == cid]
+
+    def _order(self):
+        orders = list(self._orders)
+        ordered = {f for f, _ in orders}
+        for f, op, _ in self._filters:
+            if op in _INEQUALITY and f not in ordered:
+                orders.insert(0, (f, ASCENDING))
+                ordered.add(f)
+        return orders
+
+    def _matches(self, data):
+        for f, op, value in self._filters:
+            val = _get_field(data, f)
+            if val is _MISSING or not _compare(op, val, value):
+                return False
+        return all(_get_field(data, f) is not _MISSING for f, _ in self._orders)
+
+    def _sort_key(self, orders, path, data):
+        key = []
+        for f, direction in orders:
+            k = _key(_get_field(data, f))
+            key.append(_Desc(k) if direction == DESCENDING else k)
+        key.append(_Desc(path) if orders and orders[-1][1] == DESCENDING else path)
+        return tuple(key)
+
+    def _cursor_key(self, orders):
+        fields, inclusive = self._cursor
+        if isinstance(fields, DocumentSnapshot):
+            data, path = fields._data or {}, fields.reference.path
+        else:
+            data, path = fields, None
+        key = []
+        for f, direction in orders:
+            k = _key(_get_field(data, f) if _get_field(data, f) is not _MISSING else None)
+            key.append(_Desc(k) if direction == DESCENDING else k)
+        return tuple(key), path, inclusive
+
+    def _run(self):
+        orders = self._order()
+        with self._client._store.lock:
+            hits = [
+                (f"{col}/{doc_id}", data)
+                for col, docs in self._collections()
+                for doc_id, data in docs.items()
+                if self._matches(data)
+            ]
+            keyed = sorted(
+                ((self._sort_key(orders, path, data), path, data) for path, data in hits),
+                key=lambda t: t[0],
+            )
+            if self._cursor is not None:
+                ckey, cpath, inclusive = self._cursor_key(orders)
+                n = len(ckey)
+
+                def after(k, path):
+                    if k[:n] != ckey:
+                        return k[:n] > ckey
+                    if cpath is None:
+                        return inclusive
+                    return path >= cpath if inclusive else path > cpath
+                keyed = [t for t in keyed if after(t[0], t[1])]
+            keyed = keyed[self._offset:]
+            if self._limit is not None:
+                keyed = keyed[:self._limit]
+            out = []
+            for _, path, data in keyed:
+                data = _project(data, self._projection) if self._projection is not None else _clone(data)
+                out.append((path, data))
+        return out
+
+    def stream(self, transaction=None):
+        read_time = datetime.now(timezone.utc)
+        for path, data in self._run():
+            yield DocumentSnapshot(DocumentReference(self._client, path), data, read_time)
+
+    def get(self, transaction=None):
+        return list(self.stream(transaction=transaction))
+
+    def on_snapshot(self, callback):
+        return _Watch(self, callback)
+
+class _Desc:
+    """Sort-key wrapper that reverses the order of its value."""
+    __slots__ = ("k",)
+
+    def __init__(self, k):
+        self.k = k
+
+    def __lt__(self, other):
+        return self.k > other.k
+
+    def __gt__(self, other):
+        return self.k < other.k
+
+    def __eq__(self, other):
+        return self.k == other.k
+
+    def __le__(self, other):
+        return self.k >= other.k
+
+    def __ge__(self, other):
+        return self.k <= other.k
+
+class CollectionReference(Query):
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self._path = tuple(path.split("/"))
+        self.id = self._path[-1]
+        super().__init__(self)
+
+    @property
+    def parent(self):
+        if len(self._path) == 1:
+            return None
+        return DocumentReference(self._client, "/".join(self._path[:-1]))
+
+    def document(self, document_id=None):
+        return DocumentReference(self._client, f"{self.path}/{document_id or uuid.uuid4().hex[:20]}")
+
+    def add(self, document_data, document_id=None):
+        ref = self.document(document_id)
+        ref.create(document_data)
+        return datetime.now(timezone.utc), ref
+
+    def list_documents(self):
+        with self._client._store.lock:
+            ids = list(self._client._store.collections.get(self.path, {}))
+        return [self.document(i) for i in ids]
+
+class _Watch:
+    """Listener on a query; the callback runs on the writing thread."""
+
+    def __init__(self, query, callback):
+        if query._limit is not None or query._cursor is not None:
+            raise NotImplementedError("memory backend listens only to unbounded queries")
+        self._query = query
+        self._callback = callback
+        self.is_active = True
+        store = query._client._store
+        with store.lock:
+            docs = query.get()
+            store.listeners.append(self)
+        changes = [DocumentChange(ChangeType.ADDED, d) for d in docs]
+        callback(docs, changes, datetime.now(timezone.utc))
+
+    def notify(self, touched):
+        q = self._query
+        changes = []
+        for col, doc_id, before, after in touched:
+            if q._all_descendants:
+                if col.rpartition("/")[2] != q._parent.id:
+                    continue
+            elif col != q._parent.path:
+                continue
+            was = before is not None and q._matches(before)
+            now = after is not None and q._matches(after)
+            if not (was or now):
+                continue
+            snap = DocumentSnapshot(DocumentReference(q._client, f"{col}/{doc_id}"),
+                                    _clone(after if now else before))
+            kind = ChangeType.MODIFIED if was and now else ChangeType.ADDED if now else ChangeType.REMOVED
+            changes.append(DocumentChange(kind, snap))
+        if changes and self.is_active:
+            self._callback(None, changes, datetime.now(timezone.utc))
+
+    def unsubscribe(self):
+        self.is_active = False
+        store = self._query._client._store
+        with store.lock:
+            if self in store.listeners:
+                store.listeners.remove(self)
+
+# ─── Batches and transactions ────────────────────────────────────────────────────
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._write_pbs = []   # same name as the real WriteBatch, so instrumentation can count it
+
+    def set(self, reference, document_data, merge=False):
+        self._write_pbs.append(("set", reference.path, document_data, merge))
+
+    def create(self, reference, document_data):
+        self._write_pbs.append(("create", reference.path, document_data, False))
+
+    def update(self, reference, field_updates, option=None):
+        self._write_pbs.append(("update", reference.path, field_updates, False))
+
+    def delete(self, reference, option=None):
+        self._write_pbs.append(("delete", reference.path, None, False))
+
+    def commit(self):
+        writes, self._write_pbs = self._write_pbs, []
+        self._client._store.apply(writes)
+        return [datetime.now(timezone.utc)] * len(writes)
+
+class Transaction(WriteBatch):
+    """Optimistic transaction: commit raises Aborted (which
+    @firestore.transactional retries) if a document it read has changed."""
+
+    def __init__(self, client, max_attempts=5, read_only=False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._read_versions = {}
+
+    def _clean_up(self):
+        self._write_pbs = []
+        self._read_versions = {}
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._id = uuid.uuid4().bytes
+
+    def _rollback(self):
+        self._clean_up()
+
+    def _commit(self):
+        store = self._client._store
+        with store.lock:
+            for path, version in self._read_versions.items():
+                if store.versions.get(path, 0) != version:
+                    self._clean_up()
+                    raise exceptions.Aborted(f"Transaction contention on {path}")
+            writes = self._write_pbs
+            self._clean_up()
+            store.apply(writes)
+        return [datetime.now(timezone.utc)] * len(writes)
+
+    def commit(self):
+        return self._commit()
+
+    def get_all(self, references, **_):
+        for ref in references:
+            data, version = self._client._store.read(ref.path)
+            self._read_versions.setdefault(ref.path, version)
+            yield DocumentSnapshot(ref, data)
+
+    def get(self, ref_or_query, **_):
+        if isinstance(ref_or_query, DocumentReference):
+            return self.get_all([ref_or_query])
+        snaps = ref_or_query.get()
+        for s in snaps:
+            self._read_versions.setdefault(s.reference.path, self._client._store.versions.get(s.reference.path, 0))
+        return iter(snaps)
+
+# ─── Client ──────────────────────────────────────────────────────────────────────
+class MemoryClient:
+    def __init__(self, project="memory"):
+        self.project = project
+        self._store = _Store()
+
+    def collection(self, *path):
+        return CollectionReference(self, "/".join(path))
+
+    def collection_group(self, collection_id):
+        return Query(CollectionReference(self, collection_id), all_descendants=True)
+
+    def document(self, *path):
+        return DocumentReference(self, "/".join(path))
+
+    def collections(self):
+        with self._store.lock:
+            names = [c for c in self._store.collections if "/" not in c]
+        return [CollectionReference(self, c) for c in names]
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        if transaction is not None:
+            yield from transaction.get_all(references)
+            return
+        for ref in references:
+            yield ref.get(field_paths=field_paths)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def transaction(self, max_attempts=5, read_only=False):
+        return Transaction(self, max_attempts, read_only)
+
+    def close(self):
+        pass
@@ -0,0 +1,140 @@
+# firebase/outbox.py
+# Durable write-behind queue for the front-office writes (visitor log,
+# registration, payments).
+#
+# A write is appended to a local SQLite journal and the page carries on; a
+# background thread commits the journal to Firestore in order, retrying with
+# back-off while Firestore is slow or unreachable. Every entry has a key that
+# makes replaying it harmless: plain writes go to fixed document paths, and a
+# payment's receipt ids are derived from its key (see firebase/data.py).
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+OUTBOX_PATH = os.environ.get("WISDOM_OUTBOX_PATH", "D:/wisdom/replica/outbox.db")
+IDLE_SECONDS = 5       # poll interval when nothing failed
+MAX_BACKOFF  = 60      # seconds between retries while Firestore is unreachable
+
+def _encode(v):
+    if isinstance(v, datetime):
+        return {"__datetime__": v.isoformat()}
+    raise TypeError(f"Cannot queue value of type {type(v).__name__}")
+
+def _decode(obj):
+    if set(obj) == {"__datetime__"}:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+class Outbox:
+    """Append-only journal of pending writes plus the thread that flushes it.
+
+    Rows are never deleted: status goes pending -> synced, or failed when
+    Firestore rejects the entry for good (e.g. a payment over the balance).
+    """
+
+    def __init__(self, path=OUTBOX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE NOT NULL,"
+                " kind TEXT NOT NULL, payload TEXT NOT NULL, created_at TEXT NOT NULL,"
+                " status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,"
+                " error TEXT, synced_at TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_status ON outbox(status, seq)")
+        self._wake = threading.Event()
+        self._thread = None
+        self.last_error = None
+
+    # ── journal ──
+    def add(self, kind, payload, key=None):
+        """Queue one entry; returns its idempotency key."""
+        key = key or uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO outbox (key, kind, payload, created_at) VALUES (?, ?, ?, ?)",
+                (key, kind, json.dumps(payload, default=_encode), datetime.now().isoformat()),
+            )
+        self._wake.set()
+        return key
+
+    def pending(self, kind=None, limit=None):
+        """[(key, kind, payload)] not yet synced, oldest first."""
+        sql = "SELECT key, kind, payload FROM outbox WHERE status = 'pending'"
+        params = []
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        sql += " ORDER BY seq"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(k, kd, json.loads(p, object_hook=_decode)) for k, kd, p in rows]
+
+    def mark_synced(self, keys):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'synced', synced_at = ?, attempts = attempts + 1"
+                " WHERE key = ?",
+                [(datetime.now().isoformat(), k) for k in keys],
+            )
+
+    def mark_failed(self, key, error):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'failed', error = ?, attempts = attempts + 1"
+                " WHERE key = ?", (str(error), key),
+            )
+
+    def status(self):
+        """{pending, failed, last_error, failures: [(created_at, kind, error)]}"""
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM outbox WHERE status != 'synced' GROUP BY status"
+            ).fetchall())
+            failures = self._conn.execute(
+                "SELECT created_at, kind, error FROM outbox WHERE status = 'failed'"
+                " ORDER BY seq DESC LIMIT 20"
+            ).fetchall()
+        return {
+            "pending": counts.get("pending", 0), "failed": counts.get("failed", 0),
+            "last_error": self.last_error, "failures": failures,
+        }
+
+    # ── flusher ──
+    def start(self, flush):
+        """Run flush(outbox) in a daemon thread until the journal is empty,
+        then every IDLE_SECONDS; transient errors back off up to MAX_BACKOFF."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, args=(flush,),
+                                        name="outbox-flusher", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self, flush):
+        delay, failures = 0, 0
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            if not self.pending(limit=1):
+                delay = IDLE_SECONDS
+                continue
+            try:
+                flush(self)
+            except Exception as e:   # offline / timeouts: keep the entries, retry later
+                failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                delay = min(MAX_BACKOFF, 2 ** failures)
+            else:
+                failures, delay, self.last_error = 0, 0, None
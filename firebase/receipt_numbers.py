@@ -0,0 +1,122 @@
+# firebase/receipt_numbers.py
+# Receipt numbering. Two modes (WISDOM_RECEIPT_MODE):
+#
+#   block    (default) each app process reserves WISDOM_RECEIPT_BLOCK numbers
+#            (default 50) from metadata/counters in one transaction and hands
+#            them out locally, so payments no longer queue on the counter doc.
+#            Numbers are unique but not gap-free: a block left unused when the
+#            process stops is skipped, and order follows the process, not time.
+#   gapless  the counter is advanced inside each payment transaction, as
+#            auditors may require; every payment contends on metadata/counters.
+import os
+import threading
+import time
+
+from firebase_admin import firestore
+
+RECEIPT_START = 10000
+RECEIPT_MODE  = os.environ.get("WISDOM_RECEIPT_MODE", "block")
+RECEIPT_BLOCK = int(os.environ.get("WISDOM_RECEIPT_BLOCK", "50"))
+
+class TransactionStats:
+    """Attempts / commits / failures per named transaction.
+
+    A transactional function runs once per attempt, so calling attempt() at its
+    top counts Firestore's automatic retries: retries = attempts - commits - failures.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _row(self, name):
+        return self._stats.setdefault(
+            name, {"attempts": 0, "commits": 0, "failures": 0, "seconds": 0.0}
+        )
+
+    def attempt(self, name):
+        with self._lock:
+            self._row(name)["attempts"] += 1
+
+    def finished(self, name, started, ok):
+        with self._lock:
+            row = self._row(name)
+            row["commits" if ok else "failures"] += 1
+            row["seconds"] += time.perf_counter() - started
+
+    def run(self, name, fn, *args):
+        """Call fn(*args) (a @transactional function) and record the outcome."""
+        started = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception:
+            self.finished(name, started, ok=False)
+            raise
+        self.finished(name, started, ok=True)
+        return result
+
+    def snapshot(self):
+        """{name: {attempts, commits, failures, retries, avg_ms}}"""
+        with self._lock:
+            out = {}
+            for name, row in self._stats.items():
+                done = row["commits"] + row["failures"]
+                out[name] = dict(
+                    row,
+                    retries=row["attempts"] - done,
+                    avg_ms=round(1000 * row["seconds"] / done, 1) if done else 0.0,
+                )
+            return out
+
+class ReceiptNumberBlock:
+    """Hands out receipt numbers from a block reserved on metadata/counters.
+
+    reserve(size) -> first number, if given, replaces the transaction on
+    last_receipt_no; data.py uses that for admission numbers.
+    """
+
+    def __init__(self, db, counter_doc, size=RECEIPT_BLOCK, stats=None, reserve=None):
+        self._db = db
+        self._counter_doc = counter_doc
+        self.size = size
+        self.stats = stats or TransactionStats()
+        self._reserve_block = reserve or self._reserve_receipts
+        self._lock = threading.Lock()
+        self._next = self._end = 0     # current block is [_next, _end)
+        self._returned = []            # numbers of payments that did not commit
+
+    def _reserve(self):
+        first = self._reserve_block(self.size)
+        self._next, self._end = first, first + self.size
+
+    def _reserve_receipts(self, size):
+        counter_doc, stats = self._counter_doc, self.stats
+
+        @firestore.transactional
+        def _txn(txn):
+            stats.attempt("receipt_block")
+            counters = counter_doc.get(transaction=txn).to_dict() or {}
+            last = int(counters.get("last_receipt_no") or RECEIPT_START)
+            txn.set(counter_doc, {"last_receipt_no": last + size}, merge=True)
+            return last + 1
+
+        return stats.run("receipt_block", _txn, self._db.transaction())
+
+    def take(self):
+        with self._lock:
+            if self._returned:
+                return self._returned.pop()
+            if self._next >= self._end:
+                self._reserve()
+            n = self._next
+            self._next += 1
+            return n
+
+    def give_back(self, n):
+        """Reuse the number of a payment whose transaction failed."""
+        with self._lock:
+            self._returned.append(n)
+
+    def remaining(self):
+        with self._lock:
+            return self._end - self._next + len(self._returned)
@@ -0,0 +1,268 @@
+# firebase/replica.py
+# Local SQLite (WAL) copy of students, receipts, enquiries and visitors.
+#
+# One snapshot listener per collection keeps the file current; list and
+# search screens read from it (see firebase/data.py), so they answer in a few
+# milliseconds and keep working when the campus link drops. The first snapshot
+# after start-up replaces a table wholesale, which also removes documents that
+# were deleted while the app was down (writes still in the outbox are laid
+# back on top). Until a table has synced once, readers fall back to Firestore.
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timezone
+
+REPLICA_PATH = os.environ.get("WISDOM_REPLICA_PATH", "D:/wisdom/replica/wisdom.db")
+
+# table -> indexed columns copied out of the document
+TABLES = {
+    "students":  ["admission_no", "name", "class", "section", "balance"],
+    "receipts":  ["timestamp"],
+    "enquiries": ["inquiry_date"],
+    "visitors":  ["visit_date", "time_in"],
+}
+
+def _json_default(v):
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return str(v)
+
+def _column(v):
+    """Indexed column value; aware datetimes in UTC so they sort as text."""
+    if v is None or isinstance(v, (int, float, str)):
+        return v
+    if isinstance(v, datetime) and v.tzinfo is not None:
+        v = v.astimezone(timezone.utc)
+    return _json_default(v)
+
+class Replica:
+    """The SQLite file. Reads use one connection per thread; writes share one."""
+
+    def __init__(self, path=REPLICA_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._versions = dict.fromkeys(TABLES, 0)   # bumped on every write to a table
+        self._writer = self._connect()
+        with self._writer:
+            self._writer.execute("PRAGMA journal_mode=WAL")
+            for table, cols in TABLES.items():
+                extra = "".join(f", {c}" for c in cols)
+                self._writer.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    f"(id TEXT PRIMARY KEY, parent TEXT, data TEXT NOT NULL{extra})"
+                )
+                for c in cols + ["parent"]:
+                    self._writer.execute(
+                        f"CREATE INDEX IF NOT EXISTS {table}_{c} ON {table}({c})"
+                    )
+            self._writer.execute(
+                "CREATE TABLE IF NOT EXISTS sync (tbl TEXT PRIMARY KEY, synced_at TEXT)"
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # ── writes ──
+    def _row(self, table, doc_id, data, parent):
+        cols = TABLES[table]
+        return [doc_id, parent, json.dumps(data, default=_json_default)] + \
+               [_column(data.get(c)) for c in cols]
+
+    def _upsert_sql(self, table):
+        cols = ["id", "parent", "data"] + TABLES[table]
+        return (f"INSERT OR REPLACE INTO {table} ({', '.join(cols)}) "
+                f"VALUES ({', '.join('?' * len(cols))})")
+
+    def apply(self, table, upserts=(), deletes=(), replace=False, mark_synced=False):
+        """Write [(id, data, parent)] and delete [id] in one SQLite transaction.
+
+        replace=True empties the table first (a full snapshot). Only listener
+        snapshots pass mark_synced=True; local write-through never makes a
+        table ready().
+        """
+        with self._write_lock, self._writer:
+            if replace:
+                self._writer.execute(f"DELETE FROM {table}")
+            if upserts:
+                self._writer.executemany(
+                    self._upsert_sql(table),
+                    [self._row(table, i, d, p) for i, d, p in upserts],
+                )
+            if deletes:
+                self._writer.executemany(f"DELETE FROM {table} WHERE id = ?",
+                                         [(i,) for i in deletes])
+            if mark_synced:
+                self._writer.execute(
+                    "INSERT OR REPLACE INTO sync (tbl, synced_at) VALUES (?, ?)",
+                    (table, datetime.now().isoformat()),
+                )
+            self._versions[table] += 1
+
+    def put(self, table, doc_id, data, parent=None):
+        """Write-through of a document the app has just written to Firestore."""
+        self.apply(table, upserts=[(doc_id, data, parent)])
+
+    def patch(self, table, doc_id, fields):
+        """Merge plain field values into a stored document (no-op if absent)."""
+        with self._write_lock, self._writer:
+            row = self._writer.execute(
+                f"SELECT data, parent FROM {table} WHERE id = ?", (doc_id,)
+            ).fetchone()
+            if row is None:
+                return
+            data = dict(json.loads(row[0]), **fields)
+            self._writer.execute(self._upsert_sql(table), self._row(table, doc_id, data, row[1]))
+            self._versions[table] += 1
+
+    # ── reads ──
+    def version(self, table):
+        """Changes whenever `table` is written; lets callers memoize derived data."""
+        return self._versions[table]
+
+    def ready(self, table):
+        """True once the table has been filled from Firestore at least once."""
+        row = self._reader().execute("SELECT 1 FROM sync WHERE tbl = ?", (table,)).fetchone()
+        return row is not None
+
+    def synced_at(self):
+        return dict(self._reader().execute("SELECT tbl, synced_at FROM sync").fetchall())
+
+    def select(self, table, where="", params=(), order="", limit=None, offset=0):
+        """Documents of `table` as dicts (SQL fragments use the indexed columns)."""
+        sql = f"SELECT data FROM {table}"
+        if where:
+            sql += f" WHERE {where}"
+        if order:
+            sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)} OFFSET {int(offset)}"
+        return [json.loads(r[0]) for r in self._reader().execute(sql, params)]
+
+    def select_with_ids(self, table, where="", params=(), order=""):
+        sql = f"SELECT id, data FROM {table}"
+        if where:
+            sql += f" WHERE {where}"
+        if order:
+            sql += f" ORDER BY {order}"
+        return [(i, json.loads(d)) for i, d in self._reader().execute(sql, params)]
+
+    def students_page(self, fclass="All", fsect="All", fstat="All", page_size=50, page_no=0):
+        """One page of the Registered Students list; returns (rows, has_next)."""
+        where, params = [], []
+        if fclass != "All":
+            where.append("class = ?")
+            params.append(fclass)
+        if fsect != "All":
+            where.append("section = ?")
+            params.append(fsect)
+        order = "admission_no"
+        if fstat == "Paid":
+            where.append("balance = 0")
+        elif fstat == "Due":
+            where.append("balance > 0")
+            order = "balance, admission_no"   # same order as the Firestore query
+        rows = self.select("students", " AND ".join(where), params, order,
+                           limit=page_size + 1, offset=page_no * page_size)
+        return rows[:page_size], len(rows) > page_size
+
+    def columns(self, table, cols, order=""):
+        """Rows of indexed columns only, as dicts; skips decoding the documents."""
+        sql = f"SELECT {', '.join(cols)} FROM {table}"
+        if order:
+            sql += f" ORDER BY {order}"
+        return [dict(zip(cols, r)) for r in self._reader().execute(sql)]
+
+    def receipt_index(self):
+        """admission_no -> receipts newest first (same shape as load_receipt_index)."""
+        index = {}
+        for r in self._reader().execute(
+            "SELECT parent, data FROM receipts ORDER BY timestamp DESC"
+        ):
+            index.setdefault(r[0], []).append(json.loads(r[1]))
+        return index
+
+class ReplicaSync:
+    """Snapshot listeners that copy Firestore into a Replica.
+
+    overlay(table, upserts) -> upserts, if given, adjusts each full snapshot
+    before it replaces the table (data.py re-applies writes still queued in
+    the outbox, which the snapshot cannot contain yet).
+    """
+
+    def __init__(self, db, replica, overlay=None):
+        self.db = db
+        self.replica = replica
+        self.overlay = overlay
+        self._watches = {}
+        self._first = set()
+
+    def _queries(self):
+        return {
+            "students":  self.db.collection("students"),
+            "receipts":  self.db.collection_group("receipts"),
+            "enquiries": self.db.collection("enquiries"),
+            "visitors":  self.db.collection("visitors"),
+        }
+
+    def start(self):
+        """(Re)start every listener that is not running; safe to call often."""
+        for table, query in self._queries().items():
+            watch = self._watches.get(table)
+            if watch is not None and watch.is_active:
+                continue
+            self._first.add(table)
+            try:
+                self._watches[table] = query.on_snapshot(
+                    lambda docs, changes, read_time, t=table: self._on_snapshot(t, docs, changes)
+                )
+            except Exception:
+                self._watches.pop(table, None)   # offline: keep serving the file
+
+    @staticmethod
+    def _key(table, doc):
+        """(id, parent) for a snapshot, or None for docs outside the replica."""
+        ref = doc.reference
+        if table != "receipts":
+            return ref.id, None
+        student = ref.parent.parent
+        if student is None or student.parent.id != "students":
+            return None
+        return ref.path, student.id
+
+    def _on_snapshot(self, table, docs, changes):
+        if table in self._first and docs is not None:
+            self._first.discard(table)
+            upserts = []
+            for doc in docs:
+                key = self._key(table, doc)
+                if key:
+                    upserts.append((key[0], doc.to_dict(), key[1]))
+            if self.overlay is not None:
+                upserts = self.overlay(table, upserts)
+            self.replica.apply(table, upserts, replace=True, mark_synced=True)
+            return
+        upserts, deletes = [], []
+        for change in changes:
+            key = self._key(table, change.document)
+            if not key:
+                continue
+            if change.type.name == "REMOVED":
+                deletes.append(key[0])
+            else:
+                upserts.append((key[0], change.document.to_dict(), key[1]))
+        self.replica.apply(table, upserts, deletes, mark_synced=True)
+
+    def close(self):
+        for watch in self._watches.values():
+            watch.unsubscribe()
@@ -0,0 +1,38 @@
+# firebase/timestamps.py
+# Visitor and enquiry times are stored as native Firestore timestamps
+# (timezone-aware datetimes); these helpers build and read them in school time.
+from datetime import date, datetime, time, timedelta, timezone
+
+LOCAL_TZ = timezone(timedelta(hours=5, minutes=30), "IST")   # Asia/Kolkata, no DST
+
+def now():
+    return datetime.now(LOCAL_TZ)
+
+def to_local(val):
+    """Timestamp, datetime, date or ISO string -> aware datetime in LOCAL_TZ (or None).
+
+    Naive values (the old isoformat() strings) are taken to be local time.
+    """
+    if isinstance(val, str):
+        try:
+            val = datetime.fromisoformat(val)
+        except ValueError:
+            return None
+    if isinstance(val, datetime):
+        if val.tzinfo is None:
+            return val.replace(tzinfo=LOCAL_TZ)
+        return val.astimezone(LOCAL_TZ)
+    if isinstance(val, date):
+        return start_of_day(val)
+    return None
+
+def start_of_day(d):
+    return datetime.combine(d, time.min, tzinfo=LOCAL_TZ)
+
+def local_datetime(d, t):
+    """Combine a date_input and time_input value into an aware local datetime."""
+    return datetime.combine(d, t, tzinfo=LOCAL_TZ)
+
+def date_bucket(dt):
+    """'YYYY-MM-DD' of a timestamp in local time, used as the visit_date field."""
+    return to_local(dt).date().isoformat()
@@ -0,0 +1,198 @@
+# firestore_probe.py
+# Latency / throughput probe for the configured Firestore (project, emulator
+# or WISDOM_FIRESTORE_BACKEND=memory; see firebase/firebase_config.py).
+#
+# Each scenario runs at every concurrency level and reports p50/p95/p99
+# latency and sustained ops/sec:
+#
+#   read         get() of one document
+#   query        where(...).limit(20) stream
+#   write        set() of one document
+#   transaction  read + write of a random document (little contention)
+#   counter      every worker advances ONE counter doc in a transaction, the
+#                way gap-free receipt numbering uses metadata/counters
+#   counter-block  the same counter through ReceiptNumberBlock (block mode)
+#
+# Everything is written under a scratch collection (default "_probe"), which
+# is deleted afterwards; metadata/counters itself is never touched.
+#
+#   python firestore_probe.py
+#   python firestore_probe.py --concurrency 1 8 32 --ops 400 --json campus_a.json
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("WISDOM_FIRESTORE_METRICS", "0")   # time the bare client
+os.environ.setdefault("WISDOM_FIRESTORE_LOG", "")
+
+from firebase_admin import firestore  # noqa: E402
+
+from firebase import firebase_config  # noqa: E402
+from firebase.firebase_config import get_db  # noqa: E402
+from firebase.receipt_numbers import ReceiptNumberBlock, TransactionStats  # noqa: E402
+
+SCENARIOS = ["read", "query", "write", "transaction", "counter", "counter-block"]
+SEED_DOCS = 200
+GROUPS = 10
+
+def percentile(sorted_ms, p):
+    if not sorted_ms:
+        return 0.0
+    k = max(0, min(len(sorted_ms) - 1, round(p / 100 * len(sorted_ms) + 0.5) - 1))
+    return sorted_ms[k]
+
+class Probe:
+    def __init__(self, db, collection):
+        self.db = db
+        self.col = db.collection(collection)
+        self.counter_doc = self.col.document("counters")
+        self.stats = TransactionStats()
+        self._block = None
+
+    def seed(self):
+        batch = self.db.batch()
+        for i in range(SEED_DOCS):
+            batch.set(self.col.document(f"doc{i:04d}"), {
+                "n": i, "group": i % GROUPS, "name": f"Probe {i}", "payload": "x" * 200,
+            })
+        batch.set(self.counter_doc, {"last_receipt_no": 0})
+        batch.commit()
+
+    def cleanup(self):
+        while True:
+            docs = list(self.col.limit(500).stream())
+            if not docs:
+                return
+            batch = self.db.batch()
+            for d in docs:
+                batch.delete(d.reference)
+            batch.commit()
+
+    # ── one operation per scenario ──
+    def _doc(self):
+        return self.col.document(f"doc{random.randrange(SEED_DOCS):04d}")
+
+    def op_read(self):
+        self._doc().get()
+
+    def op_query(self):
+        list(self.col.where("group", "==", random.randrange(GROUPS)).limit(20).stream())
+
+    def op_write(self):
+        self._doc().set({"touched": time.time()}, merge=True)
+
+    def op_transaction(self):
+        ref, stats = self._doc(), self.stats
+
+        @firestore.transactional
+        def _txn(txn):
+            stats.attempt("transaction")
+            n = (ref.get(transaction=txn).to_dict() or {}).get("n", 0)
+            txn.update(ref, {"n": n + 1})
+        stats.run("transaction", _txn, self.db.transaction())
+
+    def op_counter(self):
+        counter_doc, stats = self.counter_doc, self.stats
+
+        @firestore.transactional
+        def _txn(txn):
+            stats.attempt("counter")
+            counters = counter_doc.get(transaction=txn).to_dict() or {}
+            txn.set(counter_doc, {"last_receipt_no": int(counters.get("last_receipt_no") or 0) + 1},
+                    merge=True)
+        stats.run("counter", _txn, self.db.transaction())
+
+    def op_counter_block(self):
+        if self._block is None:
+            self._block = ReceiptNumberBlock(self.db, self.counter_doc, stats=self.stats)
+        self._block.take()
+
+    def run(self, scenario, concurrency, ops):
+        """Latencies (ms, sorted), wall seconds and failures for `ops` operations."""
+        fn = getattr(self, "op_" + scenario.replace("-", "_"))
+        self._block = None
+        latencies, failures = [], 0
+        lock = threading.Lock()
+
+        def worker(count):
+            nonlocal failures
+            mine, failed = [], 0
+            for _ in range(count):
+                start = time.perf_counter()
+                try:
+                    fn()
+                except Exception:
+                    failed += 1
+                    continue
+                mine.append((time.perf_counter() - start) * 1000)
+            with lock:
+                latencies.extend(mine)
+                failures += failed
+
+        shares = [ops // concurrency + (i < ops % concurrency) for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, shares))
+        return sorted(latencies), time.perf_counter() - start, failures
+
+def _backend():
+    if firebase_config.BACKEND == "memory":
+        return "in-memory fake"
+    if firebase_config.EMULATOR_HOST:
+        return f"emulator {firebase_config.EMULATOR_HOST}"
+    return f"project {firebase_config.PROJECT_ID}"
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure Firestore latency and throughput.")
+    ap.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16],
+                    help="worker threads per run")
+    ap.add_argument("--ops", type=int, default=200, help="operations per scenario and level")
+    ap.add_argument("--collection", default="_probe", help="scratch collection")
+    ap.add_argument("--keep", action="store_true", help="leave the scratch collection in place")
+    ap.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = ap.parse_args()
+
+    db = get_db()
+    probe = Probe(db, args.collection)
+    start = time.perf_counter()
+    db.collection(args.collection).document("ping").get()
+    print(f"Firestore: {_backend()}  (first round trip {1000 * (time.perf_counter() - start):.0f} ms)")
+    probe.seed()
+
+    rows = []
+    print(f"\n{'scenario':<14}{'conc':>5}{'ops':>6}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'ops/s':>9}{'retries':>9}{'failed':>8}")
+    try:
+        for scenario in args.scenarios:
+            for conc in args.concurrency:
+                probe.stats = TransactionStats()
+                lat, wall, failed = probe.run(scenario, conc, args.ops)
+                retries = sum(r["retries"] for r in probe.stats.snapshot().values())
+                row = {
+                    "scenario": scenario, "concurrency": conc, "ops": len(lat),
+                    "p50_ms": round(percentile(lat, 50), 1),
+                    "p95_ms": round(percentile(lat, 95), 1),
+                    "p99_ms": round(percentile(lat, 99), 1),
+                    "ops_per_s": round(len(lat) / wall, 1) if wall else 0.0,
+                    "retries": retries, "failed": failed,
+                }
+                rows.append(row)
+                print(f"{scenario:<14}{conc:>5}{row['ops']:>6}{row['p50_ms']:>9.1f}"
+                      f"{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['ops_per_s']:>9.1f}"
+                      f"{retries:>9}{failed:>8}")
+    finally:
+        if not args.keep:
+            probe.cleanup()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fp:
+            json.dump({"backend": _backend(), "ops": args.ops, "results": rows}, fp, indent=2)
+        print(f"\nReport written to {args.json}")
+
+if __name__ == "__main__":
+    main()
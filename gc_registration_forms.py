@@ -0,0 +1,50 @@
+# gc_registration_forms.py
+# Remove orphaned files from the registration-forms folder: leftover
+# `_registration_form.pdf` / `_view.html` variants, temp files, and forms of
+# students that no longer exist in Firestore.
+#
+#   python gc_registration_forms.py --dry-run    # always look first
+#   python gc_registration_forms.py
+#
+# Refuses to delete when Firestore returns no students, or far fewer than there
+# are forms (wrong project, emulator, partial read); --force overrides after a
+# dry run has shown the list is right.
+import argparse
+import os
+
+import pdf_builders
+from firebase.firebase_config import db
+
+MIN_KNOWN = 0.5   # refuse when fewer students than this share of the forms
+
+def main():
+    ap = argparse.ArgumentParser(description="Garbage-collect registration form PDFs.")
+    ap.add_argument("--dry-run", action="store_true", help="only list what would be removed")
+    ap.add_argument("--dir", default=pdf_builders.FORMS_DIR, help="forms folder")
+    ap.add_argument("--force", action="store_true",
+                    help="delete even if far fewer students than forms were found")
+    args = ap.parse_args()
+
+    pdf_builders.FORMS_DIR = args.dir
+    # ids only; an empty select() would download every field
+    known = {doc.id for doc in db.collection("students").select(["__name__"]).stream()}
+    if not args.dry_run and not args.force:
+        forms = set(pdf_builders.load_manifest())
+        if os.path.isdir(args.dir):
+            for fn in os.listdir(args.dir):
+                m = pdf_builders.FORM_FILE_RE.match(fn)
+                if m:
+                    forms.add(m.group("adm"))
+        if not known or len(known) < len(forms) * MIN_KNOWN:
+            raise SystemExit(
+                f"Found {len(known)} student(s) for forms of {len(forms)}; not deleting. "
+                "Check the list with --dry-run, then re-run with --force."
+            )
+    removed = pdf_builders.gc_registration_forms(known, dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    for fn in removed:
+        print(f"  {fn}")
+    print(f"{verb} {len(removed)} file(s) from {args.dir}")
+
+if __name__ == "__main__":
+    main()
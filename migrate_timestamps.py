@@ -0,0 +1,98 @@
+# migrate_timestamps.py
+# One-off: convert the ISO-string times written by older versions of the
+# Visitors and Enquiries pages into native Firestore timestamps, and add the
+# visit_date bucket to every visitor. Safe to re-run; converted docs are skipped.
+#
+#   python migrate_timestamps.py            # migrate
+#   python migrate_timestamps.py --dry-run  # only count what would change
+import argparse
+
+from firebase.firebase_config import db
+from firebase.timestamps import date_bucket, to_local
+
+BATCH_SIZE = 500
+
+VISITOR_FIELDS  = ("time_in", "time_out")
+ENQUIRY_FIELDS  = ("inquiry_date", "next_followup", "last_followup_at")
+FOLLOWUP_FIELDS = ("timestamp", "next_followup")
+
+def _converted(doc, data, fields, w):
+    """Fields of `data` that are still strings, converted to aware datetimes.
+
+    Strings to_local() cannot parse are left as they are and noted in w.skipped.
+    """
+    out = {}
+    for f in fields:
+        val = data.get(f)
+        if isinstance(val, str):
+            ts = to_local(val)
+            if ts is None:
+                w.skipped.append((doc.reference.path, f, val))
+            else:
+                out[f] = ts
+    return out
+
+class _Writer:
+    """WriteBatch that commits itself every BATCH_SIZE updates."""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.batch = db.batch()
+        self.pending = 0
+        self.updated = 0
+        self.skipped = []   # (path, field, value) that could not be parsed
+
+    def update(self, ref, fields):
+        self.updated += 1
+        if self.dry_run:
+            return
+        self.batch.update(ref, fields)
+        self.pending += 1
+        if self.pending == BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.batch.commit()
+            self.batch = db.batch()
+            self.pending = 0
+
+def migrate_visitors(w):
+    for doc in db.collection("visitors").stream():
+        v = doc.to_dict()
+        fields = _converted(doc, v, VISITOR_FIELDS, w)
+        time_in = fields.get("time_in") or v.get("time_in")
+        if to_local(time_in) and not v.get("visit_date"):
+            fields["visit_date"] = date_bucket(time_in)
+        if fields:
+            w.update(doc.reference, fields)
+
+def migrate_enquiries(w):
+    for doc in db.collection("enquiries").stream():
+        fields = _converted(doc, doc.to_dict(), ENQUIRY_FIELDS, w)
+        if fields:
+            w.update(doc.reference, fields)
+    for doc in db.collection_group("followups").stream():
+        fields = _converted(doc, doc.to_dict(), FOLLOWUP_FIELDS, w)
+        if fields:
+            w.update(doc.reference, fields)
+
+def main():
+    ap = argparse.ArgumentParser(description="Convert ISO-string times to Firestore timestamps.")
+    ap.add_argument("--dry-run", action="store_true", help="count only, write nothing")
+    args = ap.parse_args()
+
+    w = _Writer(args.dry_run)
+    migrate_visitors(w)
+    visitors = w.updated
+    migrate_enquiries(w)
+    w.flush()
+    verb = "Would update" if args.dry_run else "Updated"
+    print(f"{verb} {visitors} visitor and {w.updated - visitors} enquiry/follow-up docs.")
+    if w.skipped:
+        print(f"Left {len(w.skipped)} unparseable value(s) unchanged:")
+        for path, field, val in w.skipped:
+            print(f"  {path}.{field} = {val!r}")
+
+if __name__ == "__main__":
+    main()
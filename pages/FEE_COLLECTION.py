@@ -11,135 +11,43 @@ if st.session_state.get("role") != "Front Office":
 # File: pages/3_fee_due_list.py
 
 import streamlit as st
+import io
 import os
-import base64
+import time
+import zipfile
+from concurrent.futures import wait
 from datetime import datetime, date
 import pandas as pd
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, Table, TableStyle
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-import firebase_admin
-from firebase_admin import credentials, firestore
-
-# ─── Firebase Init ───────────────────────────────────────────────────────────────
-if not firebase_admin._apps:
-    cred = credentials.Certificate("D:/wisdom/wisdom-schools-firebase-adminsdk-fbsvc-971bbaec20.json")
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
-
-# ─── Paths & Counter Doc ─────────────────────────────────────────────────────────
-RECEIPT_DIR = "D:/wisdom/due collection receipt book"
-os.makedirs(RECEIPT_DIR, exist_ok=True)
-
-COUNTER_DOC = db.collection("metadata").document("counters")
-
-def get_next_receipt_no():
-    """Atomically increment last_receipt_no and return the new value."""
-    transaction = db.transaction()
-
-    @firestore.transactional
-    def _incr(txn):
-        snap = COUNTER_DOC.get(transaction=txn)
-        last = snap.get("last_receipt_no") or 10000
-        new = int(last) + 1
-        txn.update(COUNTER_DOC, {"last_receipt_no": new})
-        return new
-
-    return _incr(transaction)
-
-# ─── Receipt PDF Builder ─────────────────────────────────────────────────────────
-def build_receipt_pdf(student, amt, mode, next_due, rno, new_balance):
-    filename = f"REC{rno:05d}.pdf"
-    path = os.path.join(RECEIPT_DIR, filename)
-    doc = SimpleDocTemplate(path, pagesize=A4)
-    styles = getSampleStyleSheet()
-    elems = []
-
-    # Logo
-    logo = "D:/wisdom/wisdom logo.png"
-    if os.path.exists(logo):
-        elems.append(RLImage(logo, width=80, height=80))
-    elems.append(Spacer(1, 12))
-
-    elems.append(Paragraph(f"<b>Wisdom Schools</b>", styles["Title"]))
-    elems.append(Spacer(1, 6))
-    elems.append(Paragraph(f"Fee Receipt #{rno}", styles["Heading2"]))
-    elems.append(Spacer(1, 12))
-
-    # Get fee_due_date with fallback
-    due_date = student.get("fee_due_date", "Not Set")
-    if isinstance(due_date, datetime):
-        due_date = due_date.strftime("%Y-%m-%d")
-        
-    data = [
-        ["Student", student.get("name", ""), "Adm No", student.get("admission_no", "")],
-        ["Class/Section", f"{student.get('class', '')} / {student.get('section', '')}", 
-         "Due Date", due_date],
-        ["Amount Paid (₹)", f"{amt:.2f}", "Mode", mode],
-        ["New Balance (₹)", f"{new_balance:.2f}", "Next Due", next_due.isoformat()],
-    ]
-    
-    tbl = Table(data, colWidths=[120, 140, 100, 140])
-    tbl.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
-        ("GRID", (0,0), (-1,-1), 0.5, colors.black),
-        ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
-    ]))
-    elems.append(tbl)
-    elems.append(Spacer(1, 30))
-
-    elems.append(Paragraph("_______________________                _______________________",
-                           styles["Normal"]))
-    elems.append(Paragraph("Accounts Signature                       Principal Signature",
-                           styles["Normal"]))
+from firebase.firebase_config import get_db
+from firebase.instrumentation import track_page
+from firebase.data import (
+    MAX_BATCH, load_due_students, load_receipt_index, payments_queued, receipt_numbers,
+    record_payment, record_payments, show_sync_status, student_search_index, transaction_stats,
+)
+from firebase.receipt_numbers import RECEIPT_MODE
+from pdf_service import get_pdf_service
 
-    doc.build(elems)
-    return path, filename
+# ─── Firebase Client ─────────────────────────────────────────────────────────────
+db = get_db()
+fs_run = track_page("FEE_COLLECTION")   # Firestore usage of this run
+show_sync_status()
 
-# ─── Transactional Student Update ────────────────────────────────────────────────
-def update_student_balance(student_ref, amount, next_due):
-    @firestore.transactional
-    def _transaction(txn, student_ref, amount):
-        snap = student_ref.get(transaction=txn)
-        student_data = snap.to_dict()
-        
-        current_paid = student_data.get("paid", 0)
-        current_balance = student_data.get("balance", 0)
-        
-        if amount > current_balance:
-            raise ValueError("Payment amount exceeds current balance")
-            
-        new_paid = current_paid + amount
-        new_balance = current_balance - amount
-        
-        update_data = {
-            "paid": new_paid,
-            "balance": new_balance,
-        }
-        
-        # Only update fee_due_date if field exists
-        if "fee_due_date" in student_data:
-            update_data["fee_due_date"] = next_due.isoformat()
-        
-        txn.update(student_ref, update_data)
-        return new_paid, new_balance
-    
-    return _transaction(db.transaction(), student_ref, amount)
+# ─── Payment modes (payments are written by firebase/data.py) ───────────────────
+PAYMENT_MODES = ["Cash", "Online Transfer", "Cheque", "UPI", "Card"]
 
 # ─── Page Setup ─────────────────────────────────────────────────────────────────
 st.set_page_config(page_title="Fee Due List", layout="wide")
 st.title("💳 Fee Due List")
 
 # Initialize session state
-if 'receipt_data' not in st.session_state:
-    st.session_state.receipt_data = None
+if 'receipt_job' not in st.session_state:
+    st.session_state.receipt_job = None
 
 # ─── Fetch Due Students ─────────────────────────────────────────────────────────
-@st.cache_data(ttl=300, show_spinner="Fetching due students...")
 def get_due_students():
-    docs = db.collection("students").where("balance", ">", 0).stream()
-    return [doc.to_dict() for doc in docs]
+    """Served from the process-wide snapshot listener; no per-session queries."""
+    with st.spinner("Fetching due students..."):
+        return load_due_students()
 
 due_students = get_due_students()
 if not due_students:
@@ -147,6 +55,7 @@ if not due_students:
     st.stop()
 
 df = pd.DataFrame(due_students)
+receipt_index = load_receipt_index()
 
 # ─── Student Selection ──────────────────────────────────────────────────────────
 student_options = {f"{s.get('name', '')} ({s.get('admission_no', '')})": s for s in due_students}
@@ -176,10 +85,7 @@ if selected_student_key and selected_student_key in student_options:
                 max_value=float(student.get("balance", 0)),
                 step=1.0
             )
-            mode = st.selectbox(
-                "Payment Mode",
-                ["Cash", "Online Transfer", "Cheque", "UPI", "Card"]
-            )
+            mode = st.selectbox("Payment Mode", PAYMENT_MODES)
             
         with col2:
             st.subheader("Payment Schedule")
@@ -191,90 +97,181 @@ if selected_student_key and selected_student_key in student_options:
         
         if st.form_submit_button("💳 Process Payment"):
             try:
-                receipt_no = get_next_receipt_no()
-                student_ref = db.collection("students").document(student.get("admission_no", ""))
-                new_paid, new_balance = update_student_balance(student_ref, amount, next_due)
-                
-                receipt_path, receipt_filename = build_receipt_pdf(
-                    student=student,
-                    amt=amount,
-                    mode=mode,
-                    next_due=next_due,
-                    rno=receipt_no,
-                    new_balance=new_balance
+                # recorded locally; the outbox commits the transaction
+                receipt_no, new_paid, new_balance = record_payment(
+                    student, amount, mode, next_due, remarks
                 )
-                
-                # Store receipt in Firestore
-                receipt_data = {
-                    "amount": amount,
-                    "timestamp": datetime.now().isoformat(),
-                    "mode": mode,
-                    "next_due": next_due.isoformat(),
+
+                # PDF renders in the background; its path is already on the receipt doc
+                st.session_state.receipt_job = {
                     "receipt_no": receipt_no,
-                    "remarks": remarks,
-                    "pdf_path": receipt_path
+                    "future": get_pdf_service().receipt(
+                        student=student,
+                        amt=amount,
+                        mode=mode,
+                        next_due=next_due,
+                        rno=receipt_no,
+                        new_balance=new_balance
+                    )
                 }
-                student_ref.collection("receipts").add(receipt_data)
-                
-                # Store PDF content in session state
-                with open(receipt_path, "rb") as f:
-                    st.session_state.receipt_data = {
-                        "content": f.read(),
-                        "filename": receipt_filename
-                    }
-                
+
                 st.success(f"Successfully processed ₹{amount:.2f} payment!")
                 st.balloons()
-                get_due_students.clear()
+                load_receipt_index.clear()
+                student_search_index().upsert({**student, "paid": new_paid, "balance": new_balance})
 
             except Exception as e:
                 st.error(f"Payment failed: {str(e)}")
-                st.session_state.receipt_data = None
-
-# ─── Receipt Download ───────────────────────────────────────────────────────────
-if st.session_state.receipt_data:
+                st.session_state.receipt_job = None
+
+    # previous receipts: bytes are read only for the selected student
+    with st.expander("🧾 Previous Receipts"):
+        adm = student.get("admission_no", "")
+        shown = 0
+        for idx, receipt in enumerate(receipt_index.get(adm, []), 1):
+            pdf_path = receipt.get("pdf_path")
+            if pdf_path and os.path.exists(pdf_path):
+                with open(pdf_path, "rb") as f:
+                    st.download_button(
+                        f"⬇️ Receipt {idx} (#{receipt.get('receipt_no', '')})",
+                        data=f.read(),
+                        file_name=os.path.basename(pdf_path),
+                        mime="application/pdf",
+                        key=f"prev_receipt_{adm}_{idx}"
+                    )
+                shown += 1
+        if not shown:
+            st.write("No receipts yet.")
+
+# ─── Batch Payment ──────────────────────────────────────────────────────────────
+if 'batch_result' not in st.session_state:
+    st.session_state.batch_result = None
+
+with st.expander("👨‍👩‍👧 Batch Payment (siblings / class list)"):
+    class_pick = st.selectbox(
+        "Add a whole class",
+        [""] + sorted({str(s.get("class", "")) for s in due_students}),
+        key="batch_class"
+    )
+    picked = st.multiselect(
+        "Students",
+        options=list(student_options.keys()),
+        default=[k for k, s in student_options.items()
+                 if class_pick and str(s.get("class", "")) == class_pick],
+        key=f"batch_students_{class_pick}"
+    )
+    if picked:
+        with st.form(key="batch_payment_form"):
+            table = pd.DataFrame([{
+                "Student": k,
+                "Balance (₹)": float(student_options[k].get("balance", 0)),
+                "Amount (₹)": float(student_options[k].get("balance", 0)),
+            } for k in picked])
+            edited = st.data_editor(
+                table,
+                disabled=["Student", "Balance (₹)"],
+                column_config={"Amount (₹)": st.column_config.NumberColumn(min_value=0.0, step=1.0)},
+                hide_index=True,
+                use_container_width=True
+            )
+            bc1, bc2 = st.columns(2)
+            with bc1:
+                batch_mode = st.selectbox("Payment Mode", PAYMENT_MODES, key="batch_mode")
+            with bc2:
+                batch_next_due = st.date_input("Next Due Date", min_value=date.today(), key="batch_next_due")
+            batch_remarks = st.text_input("Remarks", key="batch_remarks")
+
+            if st.form_submit_button("💳 Process Batch Payment"):
+                rows = [
+                    (student_options[r["Student"]], float(r["Amount (₹)"] or 0))
+                    for r in edited.to_dict("records")
+                ]
+                rows = [(s, a) for s, a in rows if a > 0]
+                if not rows:
+                    st.error("Enter an amount for at least one student.")
+                elif len(rows) > MAX_BATCH:
+                    st.error(f"At most {MAX_BATCH} students per batch.")
+                else:
+                    started = time.perf_counter()
+                    try:
+                        results = record_payments(rows, batch_mode, batch_next_due, batch_remarks)
+                    except Exception as e:
+                        st.error(f"Batch payment failed, nothing was recorded: {str(e)}")
+                    else:
+                        committed = time.perf_counter() - started
+                        svc = get_pdf_service()
+                        futures = [
+                            svc.receipt(student=s, amt=a, mode=batch_mode, next_due=batch_next_due,
+                                        rno=rno, new_balance=bal)
+                            for (s, a), (rno, _, bal) in zip(rows, results)
+                        ]
+                        with st.spinner(f"Generating {len(futures)} receipts..."):
+                            wait(futures)
+                        load_receipt_index.clear()
+                        index = student_search_index()
+                        for (s, _), (_, paid, bal) in zip(rows, results):
+                            index.upsert({**s, "paid": paid, "balance": bal})
+                        st.session_state.batch_result = {
+                            "count": len(rows),
+                            "total": sum(a for _, a in rows),
+                            "committed": committed,
+                            "queued": payments_queued(),
+                            "elapsed": time.perf_counter() - started,
+                            "receipts": [f.result() for f in futures if not f.exception()],
+                            "failed": [rno for (rno, _, _), f in zip(results, futures) if f.exception()],
+                        }
+
+if st.session_state.batch_result:
+    res = st.session_state.batch_result
+    if res["queued"]:   # the outbox commits it; show_sync_status() reports when it has
+        saved = (f"Queued {res['count']} payments (₹{res['total']:.2f}) in "
+                 f"{res['committed'] * 1000:.0f} ms, to be saved as one transaction "
+                 f"(see the sync status in the sidebar); ")
+    else:
+        saved = (f"Recorded {res['count']} payments (₹{res['total']:.2f}) as one transaction: "
+                 f"saved in {res['committed'] * 1000:.0f} ms, ")
+    st.success(saved + f"{len(res['receipts'])} receipts ready in {res['elapsed'] * 1000:.0f} ms total.")
+    if res["failed"]:
+        st.error(f"Receipts that could not be generated: {', '.join(map(str, res['failed']))}")
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for receipt_path, receipt_filename in res["receipts"]:
+            zf.write(receipt_path, receipt_filename)
     st.download_button(
-        label="⬇️ Download Receipt",
-        data=st.session_state.receipt_data["content"],
-        file_name=st.session_state.receipt_data["filename"],
-        mime="application/pdf",
-        key=f"download_{datetime.now().timestamp()}"
+        "⬇️ Download All Receipts (.zip)",
+        data=buf.getvalue(),
+        file_name=f"receipts_{datetime.now():%Y%m%d_%H%M%S}.zip",
+        mime="application/zip",
+        on_click=lambda: st.session_state.update(batch_result=None)
     )
-    st.session_state.receipt_data = None
+
+# ─── Receipt Download ───────────────────────────────────────────────────────────
+if st.session_state.receipt_job:
+    job = st.session_state.receipt_job
+    if not job["future"].done():
+        st.info(f"🖨️ Receipt #{job['receipt_no']} is being generated...")
+        st.button("🔄 Refresh")
+    elif job["future"].exception():
+        st.error(
+            f"Payment saved, but receipt #{job['receipt_no']} could not be generated: "
+            f"{job['future'].exception()}"
+        )
+        st.session_state.receipt_job = None
+    else:
+        receipt_path, receipt_filename = job["future"].result()
+        with open(receipt_path, "rb") as f:
+            st.download_button(
+                label="⬇️ Download Receipt",
+                data=f.read(),
+                file_name=receipt_filename,
+                mime="application/pdf",
+                key=f"download_{datetime.now().timestamp()}"
+            )
+        st.session_state.receipt_job = None
 
 # ─── Due List Display ───────────────────────────────────────────────────────────
 st.markdown("### 📋 Current Due List")
 
-def make_receipt_links(adm_no):
-    try:
-        receipts_ref = db.collection("students").document(adm_no).collection("receipts")
-        receipts = [r.to_dict() for r in receipts_ref.stream()]
-        
-        if not receipts:
-            return "—"
-            
-        valid_receipts = sorted(
-            [r for r in receipts if 'timestamp' in r and 'pdf_path' in r],
-            key=lambda x: x["timestamp"],
-            reverse=True
-        )
-        
-        links = []
-        for idx, receipt in enumerate(valid_receipts, 1):
-            if os.path.exists(receipt["pdf_path"]):
-                with open(receipt["pdf_path"], "rb") as f:
-                    b64 = base64.b64encode(f.read()).decode()
-                    filename = os.path.basename(receipt["pdf_path"])
-                    links.append(
-                        f'<a href="data:application/pdf;base64,{b64}" '
-                        f'download="{filename}" style="margin-right:10px;">'
-                        f'Receipt {idx}</a>'
-                    )
-        
-        return " ".join(links) if links else "—"
-    except Exception as e:
-        return "—"
-
 
 # Safe DataFrame handling
 safe_columns = ["name", "admission_no", "class", "section", "balance", "father_mobile"]
@@ -283,7 +280,9 @@ if "fee_due_date" in df.columns:
 
 display_df = df[safe_columns].copy()
 display_df["balance"] = display_df["balance"].apply(lambda x: f"₹{x:.2f}")
-display_df["Receipts"] = display_df["admission_no"].apply(make_receipt_links)
+display_df["Receipts"] = display_df["admission_no"].apply(
+    lambda adm: len(receipt_index.get(adm, [])) or "—"
+)
 
 # HTML Table
 html = display_df.to_html(escape=False, index=False)
@@ -299,4 +298,25 @@ st.download_button(
     data=df[csv_columns].to_csv(index=False),
     file_name="fee_due_list.csv",
     mime="text/csv"
-)
\ No newline at end of file
+)
+
+# ─── Receipt Numbering ──────────────────────────────────────────────────────────
+with st.expander("🔢 Receipt numbering"):
+    if RECEIPT_MODE == "gapless":
+        st.write("Mode: **gap-free** — each payment advances `metadata/counters`.")
+    else:
+        st.write(
+            f"Mode: **block** of {receipt_numbers().size} — "
+            f"{receipt_numbers().remaining()} number(s) left in this process's block."
+        )
+        st.caption(
+            "Numbers of failed payments are reused. A block left unused when the app "
+            "restarts, or a payment whose commit timed out, leaves a gap."
+        )
+    txn_rows = [{"transaction": name, **row} for name, row in transaction_stats().snapshot().items()]
+    if txn_rows:
+        st.dataframe(pd.DataFrame(txn_rows), hide_index=True, use_container_width=True)
+    else:
+        st.write("No transactions yet in this process.")
+
+fs_run.finish()
@@ -14,49 +14,47 @@ if st.session_state.get("role") != "Front Office":
 
 import re
 from datetime import date, datetime
-import pandas as pd
 import streamlit as st
 
-import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import firestore
+from firebase.firebase_config import get_db
+from firebase.data import enquiry_search_index, fetch_enquiries, index_enquiry, replica_write
+from firebase.instrumentation import track_page
+from firebase.timestamps import local_datetime, now, start_of_day, to_local
 
-# ─── Firebase Init ───────────────────────────────────────────────────────────────
-if not firebase_admin._apps:
-    cred = credentials.Certificate("D:/wisdom/wisdom-schools-firebase-adminsdk-fbsvc-971bbaec20.json")
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
+# ─── Firebase Client ─────────────────────────────────────────────────────────────
+db = get_db()
+fs_run = track_page("MANAGE_ENQUIRIES")   # Firestore usage of this run
 
 # ─── Helpers ─────────────────────────────────────────────────────────────────────
-def fetch_enquiries():
-    docs = (
-        db.collection("enquiries")
-          .order_by("inquiry_date", direction=firestore.Query.DESCENDING)
-          .stream()
-    )
-    rows = []
-    for d in docs:
-        e = d.to_dict()
-        e["id"] = d.id
-        # count follow‑ups
-        fus = db.collection("enquiries").document(d.id).collection("followups").stream()
-        e["follow_up_count"] = sum(1 for _ in fus)
-        rows.append(e)
-    return pd.DataFrame(rows)
-
-def add_followup(enq_id: str, comment: str, next_dt: datetime):
+def fmt_ts(val, fmt="%Y-%m-%d %H:%M"):
+    """Timestamp (or a not-yet-migrated ISO string) -> display text."""
+    dt = to_local(val)
+    return dt.strftime(fmt) if dt else (val or "")
+
+def add_followup(enq_id: str, comment: str, next_dt: datetime, current_count: int = 0):
+    enq_ref = db.collection("enquiries").document(enq_id)
+    ts = now()
+    batch = db.batch()
     # write new follow‑up record
-    db.collection("enquiries") \
-      .document(enq_id) \
-      .collection("followups") \
-      .add({
-          "comment": comment,
-          "timestamp": datetime.now().isoformat(),
-          "next_followup": next_dt.isoformat()
-      })
-    # update parent doc’s next_followup
-    db.collection("enquiries").document(enq_id).update({
-        "next_followup": next_dt.isoformat()
+    batch.set(enq_ref.collection("followups").document(), {
+        "comment": comment,
+        "timestamp": ts,
+        "next_followup": next_dt
     })
+    # update parent doc’s next_followup and follow‑up counters
+    batch.update(enq_ref, {
+        "next_followup": next_dt,
+        "follow_up_count": firestore.Increment(1),
+        "last_followup_at": ts
+    })
+    batch.commit()
+    # the list reads the replica; don't wait for the listener
+    replica_write("enquiries", enq_id, {
+        "next_followup": next_dt,
+        "last_followup_at": ts,
+        "follow_up_count": current_count + 1
+    }, merge=True)
 
 
 # ─── Page Setup ─────────────────────────────────────────────────────────────────
@@ -92,7 +90,7 @@ with st.expander("➕ Add New Enquiry", expanded=True):
             if not (name and re.fullmatch(r"\d{10}", mobile) and cls and lead_temp):
                 st.error("Please fill Name, 10‑digit Mobile, Class & Lead Temp.")
             else:
-                next_dt = datetime.combine(next_fu_date, next_fu_time)
+                next_dt = local_datetime(next_fu_date, next_fu_time)
                 doc = {
                     "name": name,
                     "mobile": mobile,
@@ -102,12 +100,14 @@ with st.expander("➕ Add New Enquiry", expanded=True):
                     "status": status,
                     "lead_temp": lead_temp,
                     "notes": notes,
-                    "inquiry_date": inq_date.isoformat(),
-                    "next_followup": next_dt.isoformat()
+                    "inquiry_date": start_of_day(inq_date),
+                    "next_followup": next_dt
                 }
                 ref = db.collection("enquiries").add(doc)[1]
+                replica_write("enquiries", ref.id, {**doc, "follow_up_count": 0})
                 # create initial follow‑up entry
                 add_followup(ref.id, f"Enquiry logged (status={status})", next_dt)
+                index_enquiry(ref.id, doc)
                 st.success("✔ Enquiry recorded!")
 
 
@@ -130,11 +130,9 @@ edf = df.copy()
 if filt_cls  != "All": edf = edf[edf["class_interested"] == filt_cls]
 if filt_stat != "All": edf = edf[edf["status"]           == filt_stat]
 if query:
-    mask = (
-        edf["name"].str.contains(query, case=False, na=False)
-        | edf["mobile"].str.contains(query, case=False, na=False)
-    )
-    edf = edf[mask]
+    # process-wide index (firebase/data.py), not rebuilt per keystroke
+    hit_ids = {rec["id"] for rec in enquiry_search_index().search(query)}
+    edf = edf[edf["id"].isin(hit_ids)]
 
 
 # ─── Table Header ────────────────────────────────────────────────────────────────
@@ -163,15 +161,8 @@ for _, row in edf.iterrows():
     cols[4].write(row.get("status",""))
     cols[5].write(row.get("lead_temp",""))
 
-    cols[6].write(row.get("inquiry_date",""))
-
-    # nicely format Next FU
-    try:
-        nfu = datetime.fromisoformat(row.get("next_followup",""))
-        nfu_str = nfu.strftime("%Y‑%m‑%d %H:%M")
-    except:
-        nfu_str = row.get("next_followup","")
-    cols[7].write(nfu_str)
+    cols[6].write(fmt_ts(row.get("inquiry_date"), "%Y-%m-%d"))
+    cols[7].write(fmt_ts(row.get("next_followup")))
 
     cols[8].write(row.get("follow_up_count",0))
 
@@ -193,9 +184,9 @@ for _, row in edf.iterrows():
         )
         for fdoc in fus:
             f = fdoc.to_dict()
-            ts = f.get("timestamp","")
+            ts = fmt_ts(f.get("timestamp"))
             cm = f.get("comment","")
-            nf = f.get("next_followup","")
+            nf = fmt_ts(f.get("next_followup"))
             st.write(f"- **{ts}** → {cm} _(Next: {nf})_")
 
         # the inline form itself
@@ -207,11 +198,15 @@ for _, row in edf.iterrows():
             submit_fu    = st.form_submit_button("Save Follow‑Up")
             if submit_fu:
                 if comment.strip():
-                    next_dt = datetime.combine(dt_date, dt_time)
-                    add_followup(row["id"], comment.strip(), next_dt)
+                    next_dt = local_datetime(dt_date, dt_time)
+                    add_followup(row["id"], comment.strip(), next_dt,
+                                 int(row.get("follow_up_count", 0) or 0))
+                    index_enquiry(row["id"], {"name": row["name"], "mobile": row["mobile"]})
                     st.success("✔ Follow‑up saved.")
                     st.session_state.open_fu = None
                 else:
                     st.error("Please enter a comment.")
 
         st.markdown("---")
+
+fs_run.finish()
@@ -10,16 +10,20 @@ if st.session_state.get("role") != "Front Office":
 import os
 import streamlit as st
 import pandas as pd
-from datetime import datetime, date, time, timedelta
-import firebase_admin
-from firebase_admin import credentials, firestore
+from datetime import date, timedelta
+from firebase.firebase_config import get_db
+from firebase.instrumentation import track_page
+from firebase.data import (
+    index_visitor, load_roster, load_visitors, new_doc_id, queue_writes, queued_paths,
+    show_sync_status, visitor_search_index,
+)
+from firebase.timestamps import date_bucket, now, to_local
 
-# ─── Page config & Firebase init ────────────────────────────────────────────────
+# ─── Page config & Firebase client ────────────────────────────────────────────────
 st.set_page_config(page_title="Visitor Log", layout="wide")
-if not firebase_admin._apps:
-    cred = credentials.Certificate("D:/wisdom/wisdom-schools-firebase-adminsdk-fbsvc-971bbaec20.json")
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
+db = get_db()
+fs_run = track_page("MANAGE_VISITORS")   # Firestore usage of this run
+show_sync_status()
 
 # ─── Header ───────────────────────────────────────────────────────────────────────
 st.markdown(
@@ -45,8 +49,8 @@ with st.expander("➕ Log New Visitor", expanded=True):
         child = ""
         if purpose == "Collect Child":
             students = [
-                s.to_dict().get("name","") + f" ({s.to_dict().get('admission_no','')})"
-                for s in db.collection("students").stream()
+                s.get("name","") + f" ({s.get('admission_no','')})"
+                for s in load_roster()
             ]
             child = st.selectbox("Select Child", [""] + sorted(filter(None, students)))
         details = st.text_area("Additional Details")
@@ -54,93 +58,122 @@ with st.expander("➕ Log New Visitor", expanded=True):
         if not name or not mobile:
             st.error("Name & mobile are required.")
         else:
+            time_in = now()
             rec = {
-                "name":     name.strip(),
-                "mobile":   mobile.strip(),
-                "purpose":  purpose,
-                "child":    child if purpose=="Collect Child" else "",
-                "details":  details.strip(),
-                "time_in":  datetime.now().isoformat(),
-                "time_out": None
+                "name":       name.strip(),
+                "mobile":     mobile.strip(),
+                "purpose":    purpose,
+                "child":      child if purpose=="Collect Child" else "",
+                "details":    details.strip(),
+                "time_in":    time_in,
+                "time_out":   None,
+                "visit_date": date_bucket(time_in)
             }
             try:
-                db.collection("visitors").add(rec)
+                # queued locally; the outbox commits it to Firestore
+                doc_id = new_doc_id("visitors")
+                queue_writes([(f"visitors/{doc_id}", rec, False)])
+                index_visitor(doc_id, rec)
                 st.success("Visitor logged successfully!")
             except Exception as e:
                 st.error(f"Error logging visitor: {e}")
 
 st.markdown("---")
 
-# ─── Date picker to view logs ────────────────────────────────────────────────────
-view_date = st.date_input("📅 Select Date", value=date.today())
-start   = datetime.combine(view_date, time.min)
-end     = start + timedelta(days=1)
+# ─── Period picker to view logs ──────────────────────────────────────────────────
+p1, p2 = st.columns((1,3))
+with p1:
+    period = st.radio("View", ["Day","Month","Year"], horizontal=True)
+with p2:
+    view_date = st.date_input("📅 Select Date", value=date.today())
 
 # ─── Fetch & Normalize ────────────────────────────────────────────────────────────
-def _to_dt(val):
-    if isinstance(val, datetime):
-        return val
-    if isinstance(val, str):
-        try:
-            return datetime.fromisoformat(val)
-        except:
-            return None
-    return None
-
-docs = (
-    db.collection("visitors")
-      .where("time_in", ">=", start)
-      .where("time_in", "<",  end)
-      .stream()
-)
+# read from the local replica once it has synced (see firebase/data.py)
+if period == "Day":
+    first, nxt = view_date, view_date + timedelta(days=1)
+    title_period = view_date.strftime("%d %b %Y")
+    time_fmt = "%I:%M %p"
+else:
+    if period == "Month":
+        first = view_date.replace(day=1)
+        nxt   = (first + timedelta(days=32)).replace(day=1)
+        title_period = view_date.strftime("%B %Y")
+    else:
+        first = view_date.replace(month=1, day=1)
+        nxt   = first.replace(year=first.year + 1)
+        title_period = str(view_date.year)
+    time_fmt = "%d %b %I:%M %p"
 
 rows = []
-for d in docs:
-    v     = d.to_dict()
-    tin   = _to_dt(v.get("time_in"))
-    tout  = _to_dt(v.get("time_out"))
+for doc_id, v in load_visitors(first, nxt):
+    tin   = to_local(v.get("time_in"))
+    tout  = to_local(v.get("time_out"))
     if not tin:
         continue
     rows.append({
-        "id":       d.id,
+        "id":       doc_id,
         "Name":     v.get("name","—"),
         "Mobile":   v.get("mobile","—"),
         "Purpose":  v.get("purpose","—"),
         "Child":    v.get("child","—"),
-        "Time In":  tin.strftime("%I:%M %p"),
-        "Time Out": tout.strftime("%I:%M %p") if tout else "—",
+        "Time In":  tin.strftime(time_fmt),
+        "Time Out": tout.strftime(time_fmt) if tout else "—",
         "Details":  v.get("details","—")
     })
 
-df = pd.DataFrame(rows)
-
-# ─── Filters & Search ─────────────────────────────────────────────────────────────
-colA, colB = st.columns((3,1))
-with colA:
-    query = st.text_input("🔍 Search Name / Mobile / Purpose")
-with colB:
-    purpose_filter = st.selectbox(
-        "Purpose Filter",
-        ["All"] + sorted(df["Purpose"].unique())
-    )
-
-if purpose_filter != "All":
-    df = df[df["Purpose"] == purpose_filter]
-
-if query:
-    q = query.lower()
-    df = df[df.apply(
-        lambda r: q in str(r["Name"]).lower()
-              or q in str(r["Mobile"])
-              or q in str(r["Purpose"]).lower(),
-        axis=1
-    )]
-
-# ─── Display Table with Time-Out Buttons ──────────────────────────────────────────
-st.markdown("### 👥 Visitors on " + view_date.strftime("%d %b %Y"))
-if df.empty:
-    st.info("No visitors logged for this date.")
-else:
+# time-outs marked in this session, shown before the next full run re-reads them
+if "visitor_time_outs" not in st.session_state:
+    st.session_state.visitor_time_outs = {}
+
+def mark_time_out(doc_id, name):
+    """Button callback: one queued write plus an optimistic update of the row."""
+    try:
+        time_out = now()
+        queue_writes([(f"visitors/{doc_id}", {"time_out": time_out}, True)])
+    except Exception as e:
+        st.session_state.visitor_notice = (f"Failed to set time-out: {e}", "⚠️")
+    else:
+        st.session_state.visitor_time_outs[doc_id] = time_out
+        st.session_state.visitor_notice = (f"Time-out recorded for {name}", "🕓")
+
+# ─── Visitor table (reruns on its own) ───────────────────────────────────────────
+# Search, the purpose filter and Time-Out rerun only this fragment, with the
+# rows of the last full run: no entry form, roster or period query again.
+@st.fragment
+def visitor_table(rows, title_period, time_fmt):
+    notice = st.session_state.pop("visitor_notice", None)
+    if notice:
+        st.toast(notice[0], icon=notice[1])
+    marked = st.session_state.visitor_time_outs
+    pending = queued_paths()   # ⏳ on rows not yet in Firestore
+    df = pd.DataFrame([
+        dict(r, **{"Time Out": marked[r["id"]].strftime(time_fmt)}) if r["id"] in marked else r
+        for r in rows
+    ], columns=["id","Name","Mobile","Purpose","Child","Time In","Time Out","Details"])
+
+    # ─── Filters & Search ───
+    colA, colB = st.columns((3,1))
+    with colA:
+        query = st.text_input("🔍 Search Name / Mobile / Purpose")
+    with colB:
+        purpose_filter = st.selectbox(
+            "Purpose Filter",
+            ["All"] + sorted(df["Purpose"].unique())
+        )
+
+    if purpose_filter != "All":
+        df = df[df["Purpose"] == purpose_filter]
+
+    if query:
+        # process-wide index (firebase/data.py), not rebuilt per keystroke
+        hit_ids = {rec["id"] for rec in visitor_search_index().search(query)}
+        df = df[df["id"].isin(hit_ids)]
+
+    # ─── Display Table with Time-Out Buttons ───
+    st.markdown("### 👥 Visitors on " + title_period)
+    if df.empty:
+        st.info("No visitors logged for this period.")
+        return
     # header row
     cols = st.columns([2,1,1,1,1,1,2,1])
     for c, h in zip(cols, ["Name","Mobile","Purpose","Child","Time In","Time Out","Details","Action"]):
@@ -148,7 +181,7 @@ else:
     # data rows
     for _, row in df.iterrows():
         cols = st.columns([2,1,1,1,1,1,2,1])
-        cols[0].write(row["Name"])
+        cols[0].write(row["Name"] + (" ⏳" if f"visitors/{row['id']}" in pending else ""))
         cols[1].write(row["Mobile"])
         cols[2].write(row["Purpose"])
         cols[3].write(row["Child"])
@@ -157,15 +190,11 @@ else:
         cols[6].write(row["Details"])
         # only show button if time_out missing
         if row["Time Out"] == "—":
-            if cols[7].button("🕓 Mark Time-Out", key=row["id"]):
-                try:
-                    db.collection("visitors").document(row["id"]).update({
-                        "time_out": datetime.now().isoformat()
-                    })
-                    st.success(f"Time-out recorded for {row['Name']}")
-                    # re-run so the new Time-Out shows up
-                    st.experimental_rerun()
-                except Exception as e:
-                    st.error(f"Failed to set time-out: {e}")
+            cols[7].button("🕓 Mark Time-Out", key=row["id"], on_click=mark_time_out,
+                           args=(row["id"], row["Name"]))
         else:
             cols[7].write("✅ Done")
+
+visitor_table(rows, title_period, time_fmt)
+
+fs_run.finish()
@@ -9,234 +9,169 @@ if st.session_state.get("role") != "Front Office":
 
 import os
 import base64
-import pandas as pd
+from concurrent.futures import as_completed
 import streamlit as st
 import streamlit.components.v1 as components
-from datetime import datetime
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, Table, TableStyle
+from firebase.firebase_config import get_db
+from firebase.instrumentation import track_page
+from firebase.data import (
+    all_students, load_receipt_index, load_students_page, replica_students_page,
+    student_search_index, students_query,
 )
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import mm
-import firebase_admin
-from firebase_admin import credentials, firestore, initialize_app
-
-# ─── Firebase init ───────────────────────────────────────────────────────────────
-if not firebase_admin._apps:
-    cred = credentials.Certificate(
-        "D:/wisdom/wisdom-schools-firebase-adminsdk-fbsvc-971bbaec20.json"
-    )
-    initialize_app(cred)
-db = firestore.client()
+from students_table import students_table_html
+from pdf_service import get_pdf_service
+
+# ─── Firebase client (shared, see firebase/firebase_config.py) ────────────────────
+db = get_db()
+fs_run = track_page("REGISTERED_STUDENTS")   # Firestore usage of this run
+
+CLASS_OPTS   = ["Nursery","LKG","UKG"] + [str(i) for i in range(1,11)]
+SECTION_OPTS = ["A","B","C","D","E"]
+PAGE_SIZES   = [25, 50, 100, 200]
+ROW_HEIGHT   = 64   # px per table row incl. thumbnail
 
 # ─── Helpers ─────────────────────────────────────────────────────────────────────
-def load_students():
-    """Fetch all students as a list of dicts."""
-    return [doc.to_dict() for doc in db.collection("students").stream()]
-
-def build_registration_pdf(student):
-    """Return path to registration-form PDF, building it if needed."""
-    out_dir = "D:/wisdom/Registration forms"
-    os.makedirs(out_dir, exist_ok=True)
-    adm = student.get("admission_no", "unknown")
-    path = os.path.join(out_dir, f"{adm}_form.pdf")
-    if os.path.exists(path):
-        return path
-
-    doc = SimpleDocTemplate(
-        path, pagesize=A4,
-        leftMargin=20*mm, rightMargin=20*mm,
-        topMargin=20*mm, bottomMargin=20*mm
-    )
-    styles = getSampleStyleSheet()
-    title_style    = ParagraphStyle("Title", parent=styles["Heading1"], alignment=1, fontSize=18)
-    subtitle_style = ParagraphStyle("Subtitle", parent=styles["Heading2"], alignment=1, fontSize=14)
-    normal         = styles["Normal"]
-    small          = ParagraphStyle("Small", parent=normal, fontSize=9)
-
-    elems = []
-    # Logo
-    logo = "D:/wisdom/wisdom logo.png"
-    if os.path.exists(logo):
-        elems.append(RLImage(logo, width=50*mm, height=25*mm, hAlign="CENTER"))
-        elems.append(Spacer(1, 6))
-
-    # Title
-    elems.append(Paragraph("🎓 Wisdom Schools", title_style))
-    elems.append(Paragraph("Student Registration Form", subtitle_style))
-    elems.append(Spacer(1, 12))
-
-    # Photo (if any)
-    photo = student.get("photo_path", "")
-    if isinstance(photo, str) and os.path.exists(photo):
-        elems.append(RLImage(photo, width=30*mm, height=40*mm, hAlign="RIGHT"))
-    elems.append(Spacer(1, 6))
-
-    # Data table
-    data = [
-        ["Name", student.get("name",""), "Admission No", student.get("admission_no","")],
-        ["Class", student.get("class",""), "Section", student.get("section","")],
-        ["DOB", student.get("dob",""), "Gender", student.get("gender","")],
-        ["Father Name", student.get("father_name",""), "Mobile", student.get("father_mobile","")],
-        ["Mother Name", student.get("mother_name",""), "Mobile", student.get("mother_mobile","")],
-        ["Email", student.get("parent_email",""), "Address", Paragraph(student.get("address",""), normal)],
-        ["Total Fee", f"₹{student.get('total_fee',0):.2f}", "Paid", f"₹{student.get('paid',0):.2f}"],
-        ["Balance", f"₹{student.get('balance',0):.2f}", "Registration Date", student.get("registration_date","")],
-    ]
-    table = Table(data, colWidths=[30*mm,60*mm,30*mm,60*mm])
-    table.setStyle(TableStyle([
-        ("BOX",        (0,0), (-1,-1), 1, colors.HexColor("#004466")),
-        ("GRID",       (0,0), (-1,-1), 0.5, colors.HexColor("#004466")),
-        ("BACKGROUND", (0,0), (-1,0),   colors.lightgrey),
-        ("FONTNAME",   (0,0), (-1,0),   "Helvetica-Bold"),
-        ("VALIGN",     (0,0), (-1,-1),  "MIDDLE"),
-        *[("BACKGROUND", (0,i), (-1,i), colors.whitesmoke) for i in range(1, len(data), 2)]
-    ]))
-    elems.append(table)
-    elems.append(Spacer(1, 24))
-
-    # Signatures
-    sig = Table(
-        [[Paragraph("______________________<br/>Principal Signature", small),
-          Paragraph("Parent Signature<br/>______________________", small)]],
-        colWidths=[80*mm,80*mm]
-    )
-    sig.setStyle(TableStyle([("ALIGN",(0,0),(-1,-1),"CENTER"), ("VALIGN",(0,0),(-1,-1),"TOP")]))
-    elems.append(sig)
-
-    elems.append(Spacer(1, 12))
-    elems.append(Paragraph(
-        f"<i>Generated on: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}</i>",
-        ParagraphStyle("Timestamp", parent=small, alignment=2)
-    ))
-
-    doc.build(elems)
-    return path
-
-def make_receipt_links(adm_no):
-    """Return HTML `<a>` links to all receipts for this admission_no."""
-    receipts = db \
-      .collection("students") \
-      .document(adm_no) \
-      .collection("receipts") \
-      .stream()
-
-    links = []
-    for idx, doc in enumerate(receipts, start=1):
-        r = doc.to_dict()
-        pdf_path = r.get("pdf_path")
-        if pdf_path and os.path.exists(pdf_path):
-            b64 = base64.b64encode(open(pdf_path, "rb").read()).decode()
-            fn  = os.path.basename(pdf_path)
-            links.append(
-                f'<a href="data:application/pdf;base64,{b64}" download="{fn}">'
-                f"Receipt {idx}</a>"
-            )
-    return " | ".join(links) if links else "—"
+def read_pdf(path):
+    """Read one PDF from disk; only called for the student picked in the panel."""
+    with open(path, "rb") as f:
+        return f.read()
 
 # ─── Streamlit UI ───────────────────────────────────────────────────────────────
 st.set_page_config(page_title="Registered Students", layout="wide")
 st.title("📋 Registered Students")
 
 # Load and display
-df = pd.DataFrame(load_students())
+receipt_index = load_receipt_index()
 
 # ─── Filters ────────────────────────────────────────────────────────────────────
-c1, c2, c3, c4 = st.columns(4)
+c1, c2, c3, c4, c5 = st.columns([2,2,2,3,1])
 with c1:
-    fclass = st.selectbox("📚 Class", ["All"] + sorted(df['class'].dropna().astype(str).unique()))
+    fclass = st.selectbox("📚 Class", ["All"] + CLASS_OPTS)
 with c2:
-    fsect  = st.selectbox("🟡 Section", ["All"] + sorted(df['section'].dropna().astype(str).unique()))
+    fsect  = st.selectbox("🟡 Section", ["All"] + SECTION_OPTS)
 with c3:
     fstat  = st.selectbox("💳 Status", ["All","Paid","Due"])
 with c4:
     search = st.text_input("🔍 Search Name/Adm No/Mobile")
-
-# ─── Apply Filters ───────────────────────────────────────────────────────────────
-flt = df.copy()
-if fclass != "All":
-    flt = flt[flt['class'].astype(str)==fclass]
-if fsect  != "All":
-    flt = flt[flt['section'].astype(str)==fsect]
-if fstat  != "All":
-    if fstat == "Paid":
-        flt = flt[flt['balance']==0]
-    else:  # Due
-        flt = flt[flt['balance']>0]
-if search:
-    s = search.lower()
-    flt = flt[
-        flt['name'].str.lower().str.contains(s, na=False) |
-        flt['admission_no'].str.lower().str.contains(s, na=False) |
-        flt['father_mobile'].astype(str).str.contains(search)
-    ]
+with c5:
+    page_size = st.selectbox("Rows", PAGE_SIZES, index=1)
+
+# back to page 1 whenever the filters or page size change
+filters = (fclass, fsect, fstat, search, page_size)
+if st.session_state.get("rs_filters") != filters:
+    st.session_state.rs_filters = filters
+    st.session_state.rs_cursors = [None]   # start_after cursor of each visited page
+page_no = len(st.session_state.rs_cursors) - 1
+
+# ─── Load the visible page ───────────────────────────────────────────────────────
+if not search:
+    # the local replica pages by offset; Firestore (until it has synced) by cursor
+    page = replica_students_page(fclass, fsect, fstat, page_size, page_no)
+    if page is not None:
+        rows, has_next = page
+        cursor = None
+    else:
+        q, order = students_query(fclass, fsect, fstat)
+        rows, has_next, cursor = load_students_page(
+            q, order, page_size, st.session_state.rs_cursors[-1]
+        )
+else:
+    # search is answered by the in-memory index; filters are applied to the hits
+    def _matches(s):
+        bal = s.get("balance", 0) or 0
+        return (
+            (fclass == "All" or str(s.get("class","")) == fclass)
+            and (fsect == "All" or str(s.get("section","")) == fsect)
+            and (fstat == "All" or (fstat == "Paid" and bal == 0) or (fstat == "Due" and bal > 0))
+        )
+    flt = [s for s in student_search_index().search(search) if _matches(s)]
+    lo = page_no * page_size
+    rows = flt[lo:lo + page_size]
+    has_next = len(flt) > lo + page_size
+    cursor = None
+
+def _next_page(cursor):
+    st.session_state.rs_cursors.append(cursor)
+
+def _prev_page():
+    st.session_state.rs_cursors.pop()
 
 # ─── Build HTML Table ───────────────────────────────────────────────────────────
-css = """
-<style>
-  table {width:100%;border-collapse:collapse;font-family:sans-serif;}
-  th,td {border:1px solid #004466;padding:6px;text-align:center;}
-  th {background:#004466;color:#fff;}
-  .Paid{background:#d4edda;}   /* paid = green */
-  .Due {background:#f8d7da;}   /* due  = pink  */
-  img.thumb{width:40px;height:50px;object-fit:cover;border-radius:4px;}
-  a.btn-dl{background:#004466;color:#fff;padding:4px 8px;border-radius:4px;
-           text-decoration:none;margin-right:4px;}
-  a.btn-vw{background:#eaeaea;color:#004466;padding:4px 8px;border-radius:4px;
-           text-decoration:none;}
-  td.receipt a {margin:0 4px;}
-</style>
-"""
-headers = [
-    "Photo","Name","Adm No","Class","Section",
-    "Reg Date","Mobile","Total","Paid","Balance",
-    "Actions","Receipt"
-]
-html = css + "<table><tr>" + "".join(f"<th>{h}</th>" for h in headers) + "</tr>"
-
-for s in flt.to_dict("records"):
-    status_cls = "Paid" if s.get("balance",0)==0 else "Due"
-
-    # thumbnail
-    thumb = "—"
-    p = s.get("photo_path","")
-    if isinstance(p,str) and os.path.exists(p):
-        b64 = base64.b64encode(open(p,"rb").read()).decode()
-        thumb = f"<img src='data:image/png;base64,{b64}' class='thumb'/>"
-
-    # registration PDF buttons
-    pdfp = build_registration_pdf(s)
-    if os.path.exists(pdfp):
-        b64    = base64.b64encode(open(pdfp,"rb").read()).decode()
-        fname  = os.path.basename(pdfp)
-        dl_btn = f"<a class='btn-dl' href='data:application/pdf;base64,{b64}' download='{fname}'>Download</a>"
-        vw_btn = f"<a class='btn-vw' href='data:application/pdf;base64,{b64}' target='_blank'>View</a>"
-    else:
-        dl_btn = vw_btn = "—"
-
-    # receipt links
-    rec_links = make_receipt_links(s['admission_no'])
-
-    html += (
-        f"<tr class='{status_cls}'>"
-        f"<td>{thumb}</td>"
-        f"<td>{s.get('name','')}</td>"
-        f"<td>{s.get('admission_no','')}</td>"
-        f"<td>{s.get('class','')}</td>"
-        f"<td>{s.get('section','')}</td>"
-        f"<td>{s.get('registration_date','')}</td>"
-        f"<td>{s.get('father_mobile','')}</td>"
-        f"<td>₹{s.get('total_fee',0):.2f}</td>"
-        f"<td>₹{s.get('paid',0):.2f}</td>"
-        f"<td>₹{s.get('balance',0):.2f}</td>"
-        f"<td>{dl_btn}{vw_btn}</td>"
-        f"<td class='receipt'>{rec_links}</td>"
-        "</tr>"
-    )
-
-html += "</table>"
+html = students_table_html(rows, receipt_index)
 
 # ─── Render ─────────────────────────────────────────────────────────────────────
-components.html(html, height=650, scrolling=True)
+if rows:
+    components.html(html, height=min(650, 60 + ROW_HEIGHT * len(rows)), scrolling=True)
+else:
+    st.info("No students match the current filters.")
+
+p1, p2, p3 = st.columns([1,2,1])
+p1.button("⬅️ Previous", disabled=page_no == 0, on_click=_prev_page)
+p2.markdown(
+    f"<div style='text-align:center;'>Page {page_no + 1}</div>",
+    unsafe_allow_html=True
+)
+p3.button(
+    "Next ➡️", disabled=not has_next, on_click=_next_page, args=(cursor,)
+)
+
+# ─── Documents (PDFs are read only for the selected student) ────────────────────
+st.markdown("### 📥 Documents")
+doc_opts = {f"{s.get('name','')} ({s.get('admission_no','')})": s for s in rows}
+picked = st.selectbox("Select student", [""] + list(doc_opts.keys()), key="docs_student")
+if picked:
+    s   = doc_opts[picked]
+    adm = s.get("admission_no","")
+    d1, d2 = st.columns(2)
+    with d1:
+        st.markdown("**Registration Form**")
+        with st.spinner("Preparing registration form..."):
+            pdfp = get_pdf_service().registration_form(s).result()
+        form_pdf = read_pdf(pdfp)
+        st.download_button(
+            "⬇️ Download Form", data=form_pdf,
+            file_name=os.path.basename(pdfp), mime="application/pdf",
+            key=f"form_{adm}"
+        )
+        if st.checkbox("👁 View Form", key=f"view_{adm}"):
+            b64 = base64.b64encode(form_pdf).decode()
+            components.html(
+                f"<iframe src='data:application/pdf;base64,{b64}' "
+                f"width='100%' height='600'></iframe>",
+                height=620
+            )
+    with d2:
+        st.markdown("**Receipts**")
+        shown = 0
+        for idx, r in enumerate(receipt_index.get(adm, []), start=1):
+            pdf_path = r.get("pdf_path")
+            if pdf_path and os.path.exists(pdf_path):
+                st.download_button(
+                    f"⬇️ Receipt {idx}", data=read_pdf(pdf_path),
+                    file_name=os.path.basename(pdf_path), mime="application/pdf",
+                    key=f"rec_{adm}_{idx}"
+                )
+                shown += 1
+        if not shown:
+            st.write("—")
+
+# ─── Bulk pre-render of missing registration forms ──────────────────────────────
+with st.expander("🖨️ Pre-generate registration forms"):
+    st.caption("Renders every missing form in the background using all CPU cores.")
+    if st.button("Generate missing forms"):
+        jobs = get_pdf_service().prewarm_registration_forms(all_students())
+        if not jobs:
+            st.success("All registration forms are already generated.")
+        else:
+            bar = st.progress(0.0, text=f"0 / {len(jobs)} forms")
+            failed = 0
+            for n, fut in enumerate(as_completed(jobs), start=1):
+                if fut.exception():
+                    failed += 1
+                bar.progress(n / len(jobs), text=f"{n} / {len(jobs)} forms")
+            if failed:
+                st.warning(f"{len(jobs) - failed} forms generated, {failed} failed.")
+            else:
+                st.success(f"{len(jobs)} forms generated.")
+
+fs_run.finish()
@@ -17,49 +17,30 @@ if st.session_state.get("role") != "Front Office":
 
 import streamlit as st
 from datetime import date, datetime
-import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase.firebase_config import get_db
+from firebase.instrumentation import track_page
+from firebase.data import (
+    allocate_adm_and_bill_no, load_roster, queue_writes, replica_write, show_sync_status,
+    student_search_index,
+)
 import os
-import re
+import bulk_import
+from student_fields import (
+    BLOOD_GROUPS, CLASS_OPTS, GENDER_OPTS, MAX_DISCOUNT, PAYMENT_MODES, SECTION_OPTS,
+    valid_mobile,
+)
+from thumbnails import build_thumbnail
+from pdf_service import get_pdf_service
 
-# ─── Firebase setup ───────────────────────────────────────────────────────────────
-if not firebase_admin._apps:
-    cred = credentials.Certificate("D:/wisdom/wisdom-schools-firebase-adminsdk-fbsvc-971bbaec20.json")
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
+# ─── Firebase client ──────────────────────────────────────────────────────────────
+db = get_db()
+fs_run = track_page("REGISTER_STUDENT")   # Firestore usage of this run
+show_sync_status()
 
-# ─── Paths & Counters ─────────────────────────────────────────────────────────────
+# ─── Paths ───────────────────────────────────────────────────────────────────────
 PHOTO_DIR = "D:/wisdom/students photos"
 os.makedirs(PHOTO_DIR, exist_ok=True)
 
-BILL_START = 1001  # now starts at 1001
-ADM_START  = 1
-
-def next_bill_no():
-    docs = db.collection("students") \
-             .order_by("bill_no", direction=firestore.Query.DESCENDING) \
-             .limit(1).stream()
-    last = next(docs, None)
-    if last:
-        try:
-            return int(last.to_dict().get("bill_no", BILL_START - 1)) + 1
-        except:
-            pass
-    return BILL_START
-
-def next_adm_no():
-    docs = db.collection("students") \
-             .order_by("admission_no", direction=firestore.Query.DESCENDING) \
-             .limit(1).stream()
-    last = next(docs, None)
-    if last:
-        try:
-            num = int(last.id)
-            return f"{num+1:04d}"
-        except:
-            pass
-    return f"{ADM_START:04d}"
-
 # ─── Page config & styling ────────────────────────────────────────────────────────
 st.set_page_config(page_title="Register Student", layout="wide")
 st.markdown("""
@@ -75,16 +56,46 @@ st.markdown("""
 st.markdown("<h1 style='text-align:center;'>🎓 Wisdom Schools</h1>", unsafe_allow_html=True)
 st.markdown("<h2 style='text-align:center;'>Register Student</h2>", unsafe_allow_html=True)
 
-# ─── Generate fresh IDs ────────────────────────────────────────────────────────────
-admission_no = next_adm_no()
-bill_no      = str(next_bill_no())
+# ─── IDs are allocated from metadata/counters on submit ──────────────────────────
 reg_dt       = datetime.now()
 st.markdown(
-    f"<h4 style='text-align:right;'>Admission No: "
-    f"<span style='color:green;'>{admission_no}</span></h4>",
+    "<h4 style='text-align:right;'>Admission No: "
+    "<span style='color:green;'>assigned on submit</span></h4>",
     unsafe_allow_html=True
 )
 
+# ─── BULK IMPORT ──────────────────────────────────────────────────────────────────
+with st.expander("📥 Bulk Import (CSV / Excel)"):
+    st.caption(
+        "One student per row; column headers are the field names: "
+        + ", ".join(bulk_import.STUDENT_COLUMNS)
+        + ". Rows are checked with the same rules as the form below."
+    )
+    sheet = st.file_uploader("Student sheet", type=["csv","xlsx"], key="bulk_sheet")
+    if sheet is not None:
+        students, rejected = bulk_import.prepare(bulk_import.read_table(sheet))
+        st.write(f"**{len(students)}** valid row(s), **{len(rejected)}** rejected.")
+        if rejected:
+            st.dataframe(
+                [{"Line": line, "Problems": "; ".join(errs)} for line, errs in rejected],
+                hide_index=True, use_container_width=True
+            )
+        if students and st.button(f"Import {len(students)} students", type="primary"):
+            bar = st.progress(0.0)
+            written, secs = bulk_import.import_students(
+                students, progress=lambda done, total: bar.progress(done / total)
+            )
+            index = student_search_index()
+            for doc in written:
+                index.upsert(doc)
+                replica_write("students", doc["admission_no"], doc)
+            load_roster.clear()
+            st.success(
+                f"✅ Imported {len(written)} students "
+                f"(Admission No {written[0]['admission_no']}–{written[-1]['admission_no']}) "
+                f"in {secs:.1f}s — {len(written) / max(secs, 1e-9):.0f} students/s."
+            )
+
 # ─── MAIN FORM ────────────────────────────────────────────────────────────────────
 with st.form("student_form"):
     # Student Info
@@ -93,17 +104,15 @@ with st.form("student_form"):
     with c1:
         name      = st.text_input("Full Name *")
         dob       = st.date_input("Date of Birth *", date.today())
-        gender    = st.selectbox("Gender *", ["","Male","Female","Other"])
+        gender    = st.selectbox("Gender *", [""] + GENDER_OPTS)
         aadhar    = st.text_input("Aadhaar Card Number")
-        blood_grp = st.selectbox("Blood Group *", ["","A+","A-","B+","B-","O+","O-","AB+","AB-"])
+        blood_grp = st.selectbox("Blood Group *", [""] + BLOOD_GROUPS)
         prev_sch  = st.text_input("Previous School (if any)")
     with c2:
         st.markdown(f"**Registration Date:** {reg_dt.strftime('%d-%m-%Y %H:%M:%S')}")
         photo = st.file_uploader("Upload Photo *", type=["jpg","png","jpeg"])
-        cls_opts = ["","Nursery","LKG","UKG"] + [str(i) for i in range(1,11)]
-        sec_opts = ["","A","B","C","D","E"]
-        student_class   = st.selectbox("Class *", cls_opts)
-        student_section = st.selectbox("Section *", sec_opts)
+        student_class   = st.selectbox("Class *", [""] + CLASS_OPTS)
+        student_section = st.selectbox("Section *", [""] + SECTION_OPTS)
         # Age
         today = date.today()
         age_years = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
@@ -114,11 +123,11 @@ with st.form("student_form"):
     st.markdown("<div class='section'><h3>👨‍👩‍👦 Parent Information</h3>", unsafe_allow_html=True)
     f_name   = st.text_input("Father Full Name *")
     f_mobile = st.text_input("Father Mobile *", max_chars=10)
-    if f_mobile and not re.fullmatch(r"\d{10}", f_mobile):
+    if f_mobile and not valid_mobile(f_mobile):
         st.error("Father's mobile must be 10 digits.")
     m_name   = st.text_input("Mother Full Name *")
     m_mobile = st.text_input("Mother Mobile *", max_chars=10)
-    if m_mobile and not re.fullmatch(r"\d{10}", m_mobile):
+    if m_mobile and not valid_mobile(m_mobile):
         st.error("Mother's mobile must be 10 digits.")
     parent_email = st.text_input("Parent Email")
     address      = st.text_area("Full Address *")
@@ -135,12 +144,9 @@ with st.form("student_form"):
     with fcol2:
         transport_fee = st.number_input("Transport Fee (₹)",  value=0, key="trans_fee")
         lab_fee       = st.number_input("Lab Fee (₹)",        value=0, key="lab_fee")
-        discount      = st.number_input("Discount (₹2000 max)", max_value=2000, value=0, key="disc")
+        discount      = st.number_input(f"Discount (₹{MAX_DISCOUNT} max)", max_value=MAX_DISCOUNT, value=0, key="disc")
         paid          = st.number_input("Fees Paid (₹)",      value=0, key="paid")
-        payment_mode  = st.selectbox("Payment Mode *", [
-                          "", "Cash", "Cheque", "Online",
-                          "Google Pay", "PhonePe", "Paytm", "UPI"
-                        ])
+        payment_mode  = st.selectbox("Payment Mode *", [""] + PAYMENT_MODES)
         balance_due_date = st.date_input("Balance Due Date *", date.today())
 
     # compute summary
@@ -152,7 +158,7 @@ with st.form("student_form"):
       f"🧾 Fee Summary: Total ₹{total} | Paid ₹{paid} | Balance ₹{balance}</div>",
       unsafe_allow_html=True
     )
-    st.markdown(f"🧾 <b>Bill No:</b> {bill_no}", unsafe_allow_html=True)
+    st.markdown("🧾 <b>Bill No:</b> assigned on submit", unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
     # submit
@@ -164,11 +170,16 @@ with st.form("student_form"):
         if not all(mandatory):
             st.error("❌ Please fill all required fields (*), upload photo, select due date & payment mode.")
         else:
+            admission_no, bill_no = allocate_adm_and_bill_no()
             ext  = photo.name.rsplit(".",1)[-1]
             fn   = f"{admission_no}_{name.replace(' ','_')}.{ext}"
             pth  = os.path.join(PHOTO_DIR, fn)
             with open(pth,"wb") as fp:
                 fp.write(photo.read())
+            try:
+                build_thumbnail(pth)
+            except OSError:
+                pass  # rebuilt lazily by the Registered Students table
 
             doc = {
                 "name":              name,
@@ -202,5 +213,13 @@ with st.form("student_form"):
                 "registration_date": reg_dt.isoformat(),
                 "photo_path":        pth
             }
-            db.collection("students").document(admission_no).set(doc)
-            st.success("✅ Registration complete! You can now view the student in the Registered Students list.")
+            queue_writes([(f"students/{admission_no}", doc, False)])   # committed by the outbox
+            get_pdf_service().registration_form(doc)   # pre-render in the background
+            student_search_index().upsert(doc)
+            load_roster.clear()
+            st.success(
+                f"✅ Registration complete! Admission No {admission_no}, Bill No {bill_no}. "
+                "You can now view the student in the Registered Students list."
+            )
+
+fs_run.finish()
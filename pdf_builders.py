@@ -0,0 +1,344 @@
+# pdf_builders.py
+# ReportLab builders for fee receipts and registration forms.
+# Kept in a plain module (no Streamlit calls) so pdf_service can run them in worker processes.
+import hashlib
+import io
+import json
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager, suppress
+from datetime import datetime
+from functools import lru_cache
+
+from PIL import Image
+
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, Table, TableStyle
+)
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import mm
+
+RECEIPT_DIR = "D:/wisdom/due collection receipt book"
+FORMS_DIR   = "D:/wisdom/Registration forms"
+LOGO_PATH   = "D:/wisdom/wisdom logo.png"
+
+# Assets are drawn at most ~50mm wide; 600px keeps them sharp at 300 dpi.
+ASSET_MAX_PX = 600
+FORM_COLOR   = colors.HexColor("#004466")
+FORM_ROWS    = 8   # rows in the registration-form data table
+
+# ─── Cached template parts (built once per process, reused by every render) ─────
+@lru_cache(maxsize=None)
+def _styles():
+    styles = getSampleStyleSheet()
+    small  = ParagraphStyle("Small", parent=styles["Normal"], fontSize=9)
+    return {
+        "title":     styles["Title"],
+        "heading2":  styles["Heading2"],
+        "normal":    styles["Normal"],
+        "small":     small,
+        "form_title":    ParagraphStyle("Title", parent=styles["Heading1"], alignment=1, fontSize=18),
+        "form_subtitle": ParagraphStyle("Subtitle", parent=styles["Heading2"], alignment=1, fontSize=14),
+        "timestamp": ParagraphStyle("Timestamp", parent=small, alignment=2),
+    }
+
+@lru_cache(maxsize=None)
+def _table_styles():
+    return {
+        "receipt": TableStyle([
+            ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
+            ("GRID", (0,0), (-1,-1), 0.5, colors.black),
+            ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
+        ]),
+        "form": TableStyle([
+            ("BOX",        (0,0), (-1,-1), 1, FORM_COLOR),
+            ("GRID",       (0,0), (-1,-1), 0.5, FORM_COLOR),
+            ("BACKGROUND", (0,0), (-1,0),   colors.lightgrey),
+            ("FONTNAME",   (0,0), (-1,0),   "Helvetica-Bold"),
+            ("VALIGN",     (0,0), (-1,-1),  "MIDDLE"),
+            *[("BACKGROUND", (0,i), (-1,i), colors.whitesmoke) for i in range(1, FORM_ROWS, 2)]
+        ]),
+        "signature": TableStyle([("ALIGN",(0,0),(-1,-1),"CENTER"), ("VALIGN",(0,0),(-1,-1),"TOP")]),
+    }
+
+@lru_cache(maxsize=256)
+def _scaled_image(path, mtime_ns):
+    """Downscale an image file once; returns (bytes, format)."""
+    with Image.open(path) as img:
+        img.thumbnail((ASSET_MAX_PX, ASSET_MAX_PX))
+        fmt = "PNG" if img.mode in ("RGBA", "LA", "P") else "JPEG"
+        if fmt == "JPEG":
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, fmt, optimize=True)
+    return buf.getvalue(), fmt
+
+def _asset(path):
+    """File-like of the pre-scaled image at `path`, or None if it is missing/unreadable."""
+    if not isinstance(path, str) or not os.path.exists(path):
+        return None
+    try:
+        data, _ = _scaled_image(path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+    return io.BytesIO(data)
+
+def registration_pdf_path(student):
+    adm = student.get("admission_no", "unknown")
+    return os.path.join(FORMS_DIR, f"{adm}_form.pdf")
+
+# ─── Registration-form cache manifest ───────────────────────────────────────────
+# FORMS_DIR/forms_manifest.json maps admission_no -> hash of what the form shows,
+# so a form is re-rendered only when those fields (or the photo) change.
+MANIFEST_NAME = "forms_manifest.json"
+TMP_GRACE_SECONDS = 600   # gc leaves younger *.tmp files alone: renders in flight
+FORM_FIELDS = (
+    "name", "admission_no", "class", "section", "dob", "gender",
+    "father_name", "father_mobile", "mother_name", "mother_mobile",
+    "parent_email", "address", "total_fee", "paid", "balance", "registration_date",
+)
+FORM_FILE_RE = re.compile(r"^(?P<adm>.+)_form\.pdf$")
+
+def registration_form_hash(student):
+    """Hash of the student fields and photo file the registration form renders."""
+    h = hashlib.sha1(json.dumps(
+        {f: student.get(f, "") for f in FORM_FIELDS}, sort_keys=True, default=str
+    ).encode())
+    photo = student.get("photo_path", "")
+    if isinstance(photo, str) and os.path.exists(photo):
+        info = os.stat(photo)
+        h.update(f"{photo}|{info.st_size}|{info.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+def _manifest_path():
+    return os.path.join(FORMS_DIR, MANIFEST_NAME)
+
+def load_manifest():
+    try:
+        with open(_manifest_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(manifest):
+    tmp = _manifest_path() + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, _manifest_path())
+
+@contextmanager
+def _manifest_lock(timeout=10.0):
+    """Cross-process lock (render pool workers update the manifest concurrently).
+
+    The lock file holds a token of its owner: a holder whose lock was broken as
+    stale must not delete the lock that another process has taken since.
+    """
+    lock = _manifest_path() + ".lock"
+    token = f"{os.getpid()}-{uuid.uuid4().hex}".encode()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() > deadline:
+                # left behind by a killed worker
+                with suppress(FileNotFoundError):
+                    os.remove(lock)
+                deadline = time.monotonic() + timeout
+            time.sleep(0.01)
+    try:
+        os.write(fd, token)
+    finally:
+        os.close(fd)
+    try:
+        yield
+    finally:
+        with suppress(FileNotFoundError):
+            with open(lock, "rb") as f:
+                owned = f.read() == token
+            if owned:
+                os.remove(lock)
+
+def _record_form(adm, digest):
+    with _manifest_lock():
+        manifest = load_manifest()
+        manifest[adm] = digest
+        _save_manifest(manifest)
+
+def registration_form_is_current(student, manifest=None):
+    """True if the cached form exists and matches the student's current data."""
+    if manifest is None:
+        manifest = load_manifest()
+    adm = student.get("admission_no", "unknown")
+    return (
+        manifest.get(adm) == registration_form_hash(student)
+        and os.path.exists(registration_pdf_path(student))
+    )
+
+def gc_registration_forms(known_adms, dry_run=False):
+    """Delete forms that are not `{adm}_form.pdf` of a known student, plus leftover
+    variants (`_registration_form.pdf`, `_view.html`, temp files).
+
+    known_adms: admission numbers of the students that still exist (the roster;
+    legacy forms without a manifest entry are kept for them). Temp files younger
+    than TMP_GRACE_SECONDS belong to renders in progress and are skipped.
+    Returns the list of removed file names.
+    """
+    if not os.path.isdir(FORMS_DIR):
+        return []
+    keep_adms = set(known_adms)
+    with _manifest_lock():
+        manifest = load_manifest()
+        removed = []
+        now = time.time()
+        for fn in sorted(os.listdir(FORMS_DIR)):
+            if fn in (MANIFEST_NAME, MANIFEST_NAME + ".lock"):
+                continue
+            m = FORM_FILE_RE.match(fn)
+            if m and m.group("adm") in keep_adms:
+                continue
+            if fn.endswith(".tmp"):
+                with suppress(FileNotFoundError):
+                    if now - os.path.getmtime(os.path.join(FORMS_DIR, fn)) < TMP_GRACE_SECONDS:
+                        continue
+            removed.append(fn)
+            if not dry_run:
+                with suppress(FileNotFoundError):
+                    os.remove(os.path.join(FORMS_DIR, fn))
+        stale = [adm for adm in manifest if adm not in keep_adms]
+        if stale and not dry_run:
+            for adm in stale:
+                del manifest[adm]
+            _save_manifest(manifest)
+    return removed
+
+# ─── Fee receipt ─────────────────────────────────────────────────────────────────
+def receipt_pdf_name(rno):
+    return f"REC{rno:05d}.pdf"
+
+def build_receipt_pdf(student, amt, mode, next_due, rno, new_balance):
+    filename = receipt_pdf_name(rno)
+    os.makedirs(RECEIPT_DIR, exist_ok=True)
+    path = os.path.join(RECEIPT_DIR, filename)
+    doc = SimpleDocTemplate(path, pagesize=A4)
+    styles = _styles()
+    elems = []
+
+    # Logo
+    logo = _asset(LOGO_PATH)
+    if logo:
+        elems.append(RLImage(logo, width=80, height=80))
+    elems.append(Spacer(1, 12))
+
+    elems.append(Paragraph("<b>Wisdom Schools</b>", styles["title"]))
+    elems.append(Spacer(1, 6))
+    elems.append(Paragraph(f"Fee Receipt #{rno}", styles["heading2"]))
+    elems.append(Spacer(1, 12))
+
+    # Get fee_due_date with fallback
+    due_date = student.get("fee_due_date", "Not Set")
+    if isinstance(due_date, datetime):
+        due_date = due_date.strftime("%Y-%m-%d")
+        
+    data = [
+        ["Student", student.get("name", ""), "Adm No", student.get("admission_no", "")],
+        ["Class/Section", f"{student.get('class', '')} / {student.get('section', '')}", 
+         "Due Date", due_date],
+        ["Amount Paid (₹)", f"{amt:.2f}", "Mode", mode],
+        ["New Balance (₹)", f"{new_balance:.2f}", "Next Due", next_due.isoformat()],
+    ]
+    
+    tbl = Table(data, colWidths=[120, 140, 100, 140])
+    tbl.setStyle(_table_styles()["receipt"])
+    elems.append(tbl)
+    elems.append(Spacer(1, 30))
+
+    elems.append(Paragraph("_______________________                _______________________",
+                           styles["normal"]))
+    elems.append(Paragraph("Accounts Signature                       Principal Signature",
+                           styles["normal"]))
+
+    doc.build(elems)
+    return path, filename
+
+# ─── Registration form ───────────────────────────────────────────────────────────
+def build_registration_pdf(student):
+    """Return path to registration-form PDF, (re)building it if missing or stale."""
+    out_dir = FORMS_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    path = registration_pdf_path(student)
+    adm = student.get("admission_no", "unknown")
+    digest = registration_form_hash(student)
+    if os.path.exists(path) and load_manifest().get(adm) == digest:
+        return path
+
+    tmp = path + f".{os.getpid()}.tmp"
+    doc = SimpleDocTemplate(
+        tmp, pagesize=A4,
+        leftMargin=20*mm, rightMargin=20*mm,
+        topMargin=20*mm, bottomMargin=20*mm
+    )
+    styles = _styles()
+    title_style    = styles["form_title"]
+    subtitle_style = styles["form_subtitle"]
+    normal         = styles["normal"]
+    small          = styles["small"]
+
+    elems = []
+    # Logo
+    logo = _asset(LOGO_PATH)
+    if logo:
+        elems.append(RLImage(logo, width=50*mm, height=25*mm, hAlign="CENTER"))
+        elems.append(Spacer(1, 6))
+
+    # Title
+    elems.append(Paragraph("🎓 Wisdom Schools", title_style))
+    elems.append(Paragraph("Student Registration Form", subtitle_style))
+    elems.append(Spacer(1, 12))
+
+    # Photo (if any)
+    photo = _asset(student.get("photo_path", ""))
+    if photo:
+        elems.append(RLImage(photo, width=30*mm, height=40*mm, hAlign="RIGHT"))
+    elems.append(Spacer(1, 6))
+
+    # Data table
+    data = [
+        ["Name", student.get("name",""), "Admission No", student.get("admission_no","")],
+        ["Class", student.get("class",""), "Section", student.get("section","")],
+        ["DOB", student.get("dob",""), "Gender", student.get("gender","")],
+        ["Father Name", student.get("father_name",""), "Mobile", student.get("father_mobile","")],
+        ["Mother Name", student.get("mother_name",""), "Mobile", student.get("mother_mobile","")],
+        ["Email", student.get("parent_email",""), "Address", Paragraph(student.get("address",""), normal)],
+        ["Total Fee", f"₹{student.get('total_fee',0):.2f}", "Paid", f"₹{student.get('paid',0):.2f}"],
+        ["Balance", f"₹{student.get('balance',0):.2f}", "Registration Date", student.get("registration_date","")],
+    ]
+    table = Table(data, colWidths=[30*mm,60*mm,30*mm,60*mm])
+    table.setStyle(_table_styles()["form"])
+    elems.append(table)
+    elems.append(Spacer(1, 24))
+
+    # Signatures
+    sig = Table(
+        [[Paragraph("______________________<br/>Principal Signature", small),
+          Paragraph("Parent Signature<br/>______________________", small)]],
+        colWidths=[80*mm,80*mm]
+    )
+    sig.setStyle(_table_styles()["signature"])
+    elems.append(sig)
+
+    elems.append(Spacer(1, 12))
+    elems.append(Paragraph(
+        f"<i>Generated on: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}</i>",
+        styles["timestamp"]
+    ))
+
+    doc.build(elems)
+    os.replace(tmp, path)
+    _record_form(adm, digest)
+    return path
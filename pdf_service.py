@@ -0,0 +1,64 @@
+# pdf_service.py
+# Renders receipts and registration forms in a process pool, so the Streamlit
+# script thread never waits on ReportLab. Pages submit jobs and poll the futures.
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import streamlit as st
+
+import pdf_builders
+
+class PdfRenderService:
+    """Process pool plus a table of in-flight jobs; a PDF is never rendered twice at once."""
+
+    def __init__(self, workers=None):
+        self._pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _submit(self, key, fn, *args):
+        with self._lock:
+            fut = self._jobs.get(key)
+            if fut is None:
+                fut = self._pool.submit(fn, *args)
+                self._jobs[key] = fut
+                fut.add_done_callback(lambda f, k=key: self._forget(k, f))
+            return fut
+
+    def _forget(self, key, fut):
+        with self._lock:
+            if self._jobs.get(key) is fut:
+                del self._jobs[key]
+
+    def pending(self):
+        """Number of jobs queued or running."""
+        with self._lock:
+            return len(self._jobs)
+
+    def receipt(self, student, amt, mode, next_due, rno, new_balance):
+        """Future -> (path, filename) of the receipt PDF."""
+        return self._submit(
+            ("receipt", rno), pdf_builders.build_receipt_pdf,
+            dict(student), amt, mode, next_due, rno, new_balance
+        )
+
+    def registration_form(self, student):
+        """Future -> path of the student's registration form PDF."""
+        return self._submit(
+            ("form", student.get("admission_no")), pdf_builders.build_registration_pdf,
+            dict(student)
+        )
+
+    def prewarm_registration_forms(self, students):
+        """Queue every missing or stale registration form; returns the futures."""
+        manifest = pdf_builders.load_manifest()
+        return [
+            self.registration_form(s) for s in students
+            if not pdf_builders.registration_form_is_current(s, manifest)
+        ]
+
+@st.cache_resource(show_spinner=False)
+def get_pdf_service():
+    """One render pool per app process (size: WISDOM_PDF_WORKERS, default all cores)."""
+    return PdfRenderService(int(os.environ.get("WISDOM_PDF_WORKERS", "0")) or None)
@@ -0,0 +1,123 @@
+# search_index.py
+# In-memory search over name / admission number / mobile, shared by the
+# Registered Students, Enquiries and Visitors pages.
+#
+#   text fields   -> every word is indexed by all of its prefixes ("ra" finds "Rajesh Kumar")
+#   exact fields  -> admission numbers, mobiles: 3-gram index + substring check,
+#                    so any part of the number matches ("43210" finds "9876543210")
+#   phone fields  -> exact fields that are normalised to their last 10 digits first
+import re
+import threading
+from collections import defaultdict
+
+_WORD_RE = re.compile(r"[0-9a-z]+")
+_PHONE_SEPARATORS_RE = re.compile(r"[\s\-+()]")
+GRAM = 3
+
+def normalize_phone(value):
+    """Digits only, without a +91 / 0 prefix."""
+    digits = re.sub(r"\D", "", str(value or ""))
+    return digits[-10:] if len(digits) > 10 else digits
+
+def _grams(s):
+    return {s[i:i + GRAM] for i in range(len(s) - GRAM + 1)}
+
+class SearchIndex:
+    """Token index over a set of records, updated incrementally with upsert()/remove()."""
+
+    def __init__(self, key, text_fields=(), exact_fields=(), phone_fields=()):
+        self.key = key
+        self.text_fields = tuple(text_fields)
+        self.exact_fields = tuple(exact_fields)
+        self.phone_fields = tuple(phone_fields)
+        self._records = {}
+        self._prefix = defaultdict(set)   # word prefix / short id prefix -> keys
+        self._gram = defaultdict(set)     # 3-gram of an exact field -> keys
+        self._exact = {}                  # key -> normalised exact values
+        self._tokens = {}                 # key -> (prefix tokens, grams), for removal
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def _tokenize(self, rec):
+        prefixes, grams, exact = set(), set(), []
+        for f in self.text_fields:
+            for word in _WORD_RE.findall(str(rec.get(f) or "").lower()):
+                prefixes.update(word[:i] for i in range(1, len(word) + 1))
+        for f in self.exact_fields + self.phone_fields:
+            v = rec.get(f)
+            v = normalize_phone(v) if f in self.phone_fields else str(v or "").lower()
+            if not v:
+                continue
+            exact.append(v)
+            prefixes.update(v[:i] for i in range(1, min(GRAM, len(v) + 1)))
+            grams |= _grams(v)
+        return prefixes, grams, exact
+
+    def get(self, k):
+        """The indexed record for key k, or None."""
+        with self._lock:
+            return self._records.get(k)
+
+    def upsert(self, rec):
+        """Add or replace one record."""
+        k = rec.get(self.key)
+        if k is None:
+            return
+        prefixes, grams, exact = self._tokenize(rec)
+        with self._lock:
+            self.remove(k)
+            self._records[k] = rec
+            self._exact[k] = exact
+            self._tokens[k] = (prefixes, grams)
+            for t in prefixes:
+                self._prefix[t].add(k)
+            for g in grams:
+                self._gram[g].add(k)
+
+    def remove(self, k):
+        with self._lock:
+            if k not in self._records:
+                return
+            prefixes, grams = self._tokens.pop(k)
+            for t in prefixes:
+                self._prefix[t].discard(k)
+                if not self._prefix[t]:
+                    del self._prefix[t]
+            for g in grams:
+                self._gram[g].discard(k)
+                if not self._gram[g]:
+                    del self._gram[g]
+            del self._records[k]
+            del self._exact[k]
+
+    def _match_term(self, term):
+        hits = set(self._prefix.get(term, ()))
+        if len(term) >= GRAM:
+            grams = sorted(_grams(term), key=lambda g: len(self._gram.get(g, ())))
+            cand = set(self._gram.get(grams[0], ()))
+            for g in grams[1:]:
+                if not cand:
+                    break
+                cand &= self._gram.get(g, set())
+            hits |= {k for k in cand if any(term in v for v in self._exact[k])}
+        return hits
+
+    def search(self, query):
+        """Records matching every term of the query, ordered by key."""
+        q = str(query or "").strip().lower()
+        if not q:
+            return []
+        if (self.phone_fields or self.exact_fields) and _PHONE_SEPARATORS_RE.sub("", q).isdigit():
+            terms = [normalize_phone(q)]   # "+91 98765-43210" is one number
+        else:
+            terms = _WORD_RE.findall(q)
+        with self._lock:
+            keys = None
+            for term in terms:
+                hits = self._match_term(term)
+                keys = hits if keys is None else keys & hits
+                if not keys:
+                    return []
+            return [self._records[k] for k in sorted(keys or (), key=str)]
@@ -0,0 +1,60 @@
+# student_fields.py
+# Field options and validation rules for a student record, shared by the
+# Register Student form and the bulk importer so both accept the same data.
+import re
+
+CLASS_OPTS    = ["Nursery", "LKG", "UKG"] + [str(i) for i in range(1, 11)]
+SECTION_OPTS  = ["A", "B", "C", "D", "E"]
+GENDER_OPTS   = ["Male", "Female", "Other"]
+BLOOD_GROUPS  = ["A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-"]
+# "Google\u00a0Pay" is the value already stored on existing students
+PAYMENT_MODES = ["Cash", "Cheque", "Online", "Google\u00a0Pay", "PhonePe", "Paytm", "UPI"]
+MAX_DISCOUNT  = 2000
+
+MOBILE_RE = re.compile(r"\d{10}")
+
+# Required on every student (the form also requires a photo upload)
+MANDATORY_FIELDS = [
+    "name", "gender", "class", "section",
+    "father_name", "father_mobile", "mother_name", "mother_mobile",
+    "address", "balance_due_date", "payment_mode",
+]
+
+FEE_FIELDS = [
+    "admission_fee", "school_fee", "book_fee", "uniform_fee",
+    "transport_fee", "lab_fee",
+]
+
+CHOICE_FIELDS = {
+    "gender": GENDER_OPTS, "class": CLASS_OPTS, "section": SECTION_OPTS,
+    "blood_group": BLOOD_GROUPS, "payment_mode": PAYMENT_MODES,
+}
+
+def canonical_choice(field, value):
+    """Map free-typed text ("google pay", "lkg") onto the option the form would store."""
+    key = " ".join(str(value or "").split()).lower()
+    for opt in CHOICE_FIELDS[field]:
+        if " ".join(opt.split()).lower() == key:
+            return opt
+    return value
+
+def valid_mobile(value):
+    return bool(MOBILE_RE.fullmatch(str(value or "")))
+
+def fee_totals(rec):
+    """(total_fee, balance) exactly as the registration form computes them."""
+    total = sum(rec.get(f) or 0 for f in FEE_FIELDS) - (rec.get("discount") or 0)
+    return total, total - (rec.get("paid") or 0)
+
+def validate_student(rec):
+    """List of problems with a student dict (empty when it can be saved)."""
+    errors = [f"{f} is required" for f in MANDATORY_FIELDS if not rec.get(f)]
+    for f, label in (("father_mobile", "Father"), ("mother_mobile", "Mother")):
+        if rec.get(f) and not valid_mobile(rec[f]):
+            errors.append(f"{label}'s mobile must be 10 digits")
+    for f, opts in CHOICE_FIELDS.items():
+        if rec.get(f) and rec[f] not in opts:
+            errors.append(f"{f} '{rec[f]}' is not one of {', '.join(opts)}")
+    if (rec.get("discount") or 0) > MAX_DISCOUNT:
+        errors.append(f"discount is over ₹{MAX_DISCOUNT}")
+    return errors
@@ -0,0 +1,55 @@
+# students_table.py
+# HTML table of the Registered Students page, built in one pass over the rows.
+from thumbnails import thumbnail_data_uri
+
+CSS = """
+<style>
+  table {width:100%;border-collapse:collapse;font-family:sans-serif;}
+  th,td {border:1px solid #004466;padding:6px;text-align:center;}
+  th {background:#004466;color:#fff;}
+  .Paid{background:#d4edda;}   /* paid = green */
+  .Due {background:#f8d7da;}   /* due  = pink  */
+  img.thumb{width:40px;height:50px;object-fit:cover;border-radius:4px;}
+</style>
+"""
+
+HEADERS = [
+    "Photo","Name","Adm No","Class","Section",
+    "Reg Date","Mobile","Total","Paid","Balance",
+    "Receipts"
+]
+
+def students_table_html(rows, receipt_index):
+    """<style> + <table> for `rows` (student dicts); receipt_index from load_receipt_index()."""
+    parts = [CSS, "<table><tr>", "".join(f"<th>{h}</th>" for h in HEADERS), "</tr>"]
+
+    for s in rows:
+        status_cls = "Paid" if s.get("balance",0)==0 else "Due"
+
+        # thumbnail
+        thumb = "—"
+        uri = thumbnail_data_uri(s.get("photo_path",""))
+        if uri:
+            thumb = f"<img src='{uri}' class='thumb'/>"
+
+        # receipt count; the PDFs themselves are served from the Documents panel
+        n_rec = len(receipt_index.get(s['admission_no'], []))
+
+        parts.append(
+            f"<tr class='{status_cls}'>"
+            f"<td>{thumb}</td>"
+            f"<td>{s.get('name','')}</td>"
+            f"<td>{s.get('admission_no','')}</td>"
+            f"<td>{s.get('class','')}</td>"
+            f"<td>{s.get('section','')}</td>"
+            f"<td>{s.get('registration_date','')}</td>"
+            f"<td>{s.get('father_mobile','')}</td>"
+            f"<td>₹{s.get('total_fee',0):.2f}</td>"
+            f"<td>₹{s.get('paid',0):.2f}</td>"
+            f"<td>₹{s.get('balance',0):.2f}</td>"
+            f"<td>{n_rec or '—'}</td>"
+            "</tr>"
+        )
+
+    parts.append("</table>")
+    return "".join(parts)
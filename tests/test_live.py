@@ -0,0 +1,122 @@
+# tests/test_live.py
+# LiveQueryView / apply_changes against real snapshot listeners.
+#
+#   python -m pytest tests                                   # in-memory backend only
+#   FIRESTORE_EMULATOR_HOST=localhost:8080 python -m pytest tests   # + the emulator
+import os
+import sys
+import time
+import uuid
+
+import pytest
+from google.api_core import exceptions
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from firebase.live import LiveQueryView, apply_changes  # noqa: E402
+from firebase.memory_store import MemoryClient  # noqa: E402
+
+def _emulator_client():
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        pytest.skip("FIRESTORE_EMULATOR_HOST is not set")
+    from google.cloud import firestore
+    return firestore.Client(project="demo-wisdom-tests")
+
+@pytest.fixture(params=["memory", "emulator"])
+def students(request):
+    """A fresh, empty students-like collection on each backend."""
+    db = MemoryClient() if request.param == "memory" else _emulator_client()
+    col = db.collection(f"students_{uuid.uuid4().hex[:8]}")
+    yield col
+    for doc in col.stream():
+        doc.reference.delete()
+
+def _eventually(check, timeout=10.0):
+    """Poll until check() is truthy; the emulator delivers events on its own thread."""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = check()
+        if result or time.monotonic() > deadline:
+            return result
+        time.sleep(0.05)
+
+def _balances(view):
+    return {s["admission_no"]: s["balance"] for s in view.values()}
+
+def test_view_follows_added_modified_removed(students):
+    students.document("0001").set({"admission_no": "0001", "balance": 500})
+    view = LiveQueryView(students.where("balance", ">", 0))
+    try:
+        assert _eventually(lambda: _balances(view) == {"0001": 500})
+
+        # ADDED
+        students.document("0002").set({"admission_no": "0002", "balance": 300})
+        assert _eventually(lambda: _balances(view) == {"0001": 500, "0002": 300})
+
+        # MODIFIED
+        students.document("0001").update({"balance": 200})
+        assert _eventually(lambda: _balances(view) == {"0001": 200, "0002": 300})
+
+        # REMOVED: leaves the query (paid up), then deleted outright
+        students.document("0001").update({"balance": 0})
+        assert _eventually(lambda: _balances(view) == {"0002": 300})
+        students.document("0002").delete()
+        assert _eventually(lambda: _balances(view) == {})
+    finally:
+        view.close()
+
+def test_view_restarts_a_dead_listener(students):
+    students.document("0001").set({"admission_no": "0001", "balance": 500})
+    view = LiveQueryView(students.where("balance", ">", 0))
+    try:
+        assert _eventually(lambda: _balances(view) == {"0001": 500})
+        dead = view._watch
+        dead.unsubscribe()
+        students.document("0002").set({"admission_no": "0002", "balance": 300})
+        assert _eventually(lambda: _balances(view) == {"0001": 500, "0002": 300})
+        assert view._watch is not dead and view._watch.is_active
+    finally:
+        view.close()
+
+def test_apply_changes_uses_change_types():
+    db = MemoryClient()
+    col = db.collection("students")
+    docs, events = {}, []
+    watch = col.on_snapshot(lambda snaps, changes, read_time: events.append(changes))
+    col.document("a").set({"n": 1})
+    col.document("a").update({"n": 2})
+    col.document("b").set({"n": 3})
+    col.document("a").delete()
+    watch.unsubscribe()
+    for changes in events:
+        apply_changes(docs, changes)
+    assert docs == {"b": {"n": 3}}
+    kinds = [c.type.name for changes in events for c in changes]
+    assert kinds == ["ADDED", "MODIFIED", "ADDED", "REMOVED"]
+
+class _OfflineQuery:
+    """A query while the link is down: the listener never reports, reads fail."""
+
+    class _Watch:
+        is_active = True
+
+        def unsubscribe(self):
+            self.is_active = False
+
+    def on_snapshot(self, callback):
+        return self._Watch()
+
+    def stream(self):
+        raise exceptions.ServiceUnavailable("offline")
+
+def test_view_serves_the_fallback_until_the_listener_reports():
+    replica = [{"admission_no": "0001", "balance": 500}]
+    view = LiveQueryView(_OfflineQuery(), fallback=lambda: replica)
+    started = time.monotonic()
+    assert view.snapshot(timeout=5.0) == (replica, True)
+    assert time.monotonic() - started < 1.0     # no wait for the listener
+
+def test_view_without_local_rows_falls_back_to_a_query():
+    view = LiveQueryView(_OfflineQuery(), fallback=lambda: None)   # replica not synced
+    with pytest.raises(exceptions.ServiceUnavailable):
+        view.values(timeout=0.1)
@@ -0,0 +1,161 @@
+# tests/test_outbox.py
+# Queued payments and writes (firebase/data.py + firebase/outbox.py) against
+# the in-memory backend. The flusher thread is not started; each test flushes
+# by hand so the order of events is fixed.
+#
+#   python -m pytest tests
+import os
+import sys
+from datetime import date
+
+import pytest
+
+os.environ["WISDOM_FIRESTORE_BACKEND"] = "memory"
+os.environ["WISDOM_FIRESTORE_METRICS"] = "0"
+os.environ["WISDOM_FIRESTORE_LOG"] = ""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st  # noqa: E402
+from google.api_core import exceptions  # noqa: E402
+
+from firebase import data, memory_store  # noqa: E402
+from firebase.firebase_config import get_db  # noqa: E402
+from firebase.outbox import Outbox  # noqa: E402
+from firebase.replica import Replica  # noqa: E402
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh MemoryClient, replica and outbox; the outbox is flushed by hand."""
+    monkeypatch.setattr(data, "Outbox", lambda: Outbox(str(tmp_path / "outbox.db")))
+    monkeypatch.setattr(data, "Replica", lambda: Replica(str(tmp_path / "replica.db")))
+    monkeypatch.setattr(Outbox, "start", lambda self, flush: None)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    client = get_db()
+    yield client
+    data._replica_sync().close()
+    st.cache_resource.clear()
+
+def _student(db, adm, balance, paid=0):
+    doc = {"admission_no": adm, "name": f"Student {adm}", "balance": balance, "paid": paid}
+    db.collection("students").document(adm).set(doc)
+    return doc
+
+def _pay(student, amount):
+    return data.record_payment(student, amount, "Cash", date(2026, 11, 1), "")
+
+def _stored(db, adm):
+    return db.collection("students").document(adm).get().to_dict()
+
+def _abort_commits(monkeypatch):
+    def _commit(self):
+        self._clean_up()
+        raise exceptions.Aborted("Transaction contention")
+    monkeypatch.setattr(memory_store.Transaction, "_commit", _commit)
+
+def test_flush_commits_a_queued_payment(db):
+    student = _student(db, "0001", 500)
+    data.replica()
+    receipt_no, paid, balance = _pay(student, 200)
+    assert (paid, balance) == (200, 300)
+    assert data.outbox().status()["pending"] == 1
+    assert _stored(db, "0001")["balance"] == 500          # not committed yet
+
+    data._flush_outbox(data.outbox())
+    assert data.outbox().status()["pending"] == 0
+    assert _stored(db, "0001")["balance"] == 300
+    receipts = [d.to_dict() for d in db.collection("students/0001/receipts").stream()]
+    assert [r["receipt_no"] for r in receipts] == [receipt_no]
+
+def test_rejected_payment_is_marked_failed(db):
+    stale = _student(db, "0001", 500)
+    db.collection("students").document("0001").update({"balance": 100})   # paid elsewhere
+    data.replica()
+    _pay(stale, 300)
+
+    data._flush_outbox(data.outbox())
+    stat = data.outbox().status()
+    assert (stat["pending"], stat["failed"]) == (0, 1)
+    assert "exceeds current balance" in stat["failures"][0][2]
+    assert _stored(db, "0001")["balance"] == 100
+    assert data.replica().select("students")[0]["balance"] == 100      # local copy undone
+    assert data.replica().receipt_index() == {}
+
+def test_contention_keeps_the_payment_queued(db, monkeypatch):
+    student = _student(db, "0001", 500)
+    data.replica()
+    _pay(student, 200)
+
+    with monkeypatch.context() as m:
+        _abort_commits(m)
+        with pytest.raises(ValueError) as err:   # left to the flusher's back-off
+            data._flush_outbox(data.outbox())
+        assert not isinstance(err.value, data.PaymentRejected)
+    stat = data.outbox().status()
+    assert (stat["pending"], stat["failed"]) == (1, 0)
+    assert _stored(db, "0001")["balance"] == 500
+
+    data._flush_outbox(data.outbox())                # the retry goes through
+    assert data.outbox().status()["pending"] == 0
+    assert _stored(db, "0001")["balance"] == 300
+
+def test_replica_restart_keeps_pending_entries(db):
+    student = _student(db, "0001", 500)
+    db.collection("visitors").document("v1").set({"name": "Old", "visit_date": "2026-10-18"})
+    rep = data.replica()
+    receipt_no, _, _ = _pay(student, 200)
+    data.queue_writes([("visitors/v2", {"name": "New", "visit_date": "2026-10-18"}, False),
+                       ("visitors/v1", {"time_out": "10:30"}, True)])
+
+    sync = data._replica_sync()
+    sync.close()
+    sync.start()                  # full snapshots replace every table
+
+    assert rep.select("students")[0]["balance"] == 300
+    assert [r["receipt_no"] for r in rep.receipt_index()["0001"]] == [receipt_no]
+    visitors = dict(rep.select_with_ids("visitors"))
+    assert visitors["v1"] == {"name": "Old", "visit_date": "2026-10-18", "time_out": "10:30"}
+    assert visitors["v2"]["name"] == "New"
+
+    data._flush_outbox(data.outbox())   # committed: the listener's copy is the same
+    assert rep.select("students")[0]["balance"] == 300
+    assert len(rep.receipt_index()["0001"]) == 1
+    assert set(dict(rep.select_with_ids("visitors"))) == {"v1", "v2"}
+
+# ─── Direct payments and number blocks ───
+def _process(db, adm, amount):
+    ref = db.collection("students").document(adm)
+    return data.process_payments([(ref, amount)], "Cash", date(2026, 11, 1), "")[0]
+
+def test_aborted_commit_gives_the_receipt_number_back(db, monkeypatch):
+    _student(db, "0001", 500)
+    first, _, _ = _process(db, "0001", 100)          # reserves the block
+    with monkeypatch.context() as m:
+        _abort_commits(m)
+        with pytest.raises(ValueError):
+            _process(db, "0001", 100)
+    with pytest.raises(data.PaymentRejected):
+        _process(db, "0001", 1000)
+    assert _process(db, "0001", 100)[0] == first + 1   # no gap
+    assert _stored(db, "0001")["balance"] == 300
+
+def test_receipt_number_block(db):
+    counters = data.counters_ref()
+    block = data.ReceiptNumberBlock(db, counters, size=3)
+    assert [block.take() for _ in range(4)] == [10001, 10002, 10003, 10004]
+    assert counters.get().to_dict()["last_receipt_no"] == 10006
+    block.give_back(10004)
+    assert block.take() == 10004
+    assert block.remaining() == 2
+
+@pytest.mark.parametrize("size", [1, 3])
+def test_admission_numbers_follow_the_counters(db, monkeypatch, size):
+    monkeypatch.setattr(data, "ADMISSION_BLOCK", size)
+    db.collection("students").document("0007").set({"admission_no": "0007", "bill_no": "1020"})
+    taken = [data.allocate_adm_and_bill_no() for _ in range(4)]
+    assert taken == [("0008", "1021"), ("0009", "1022"), ("0010", "1023"), ("0011", "1024")]
+    last = 11 if size == 1 else 13                   # the rest of a block is skipped
+    assert data.counters_ref().get().to_dict()["last_admission_no"] == last
+
+    data.admission_numbers.clear()                   # a restarted process
+    assert data.allocate_adm_and_bill_no() == (f"{last + 1:04d}", str(1013 + last + 1))
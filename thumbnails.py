@@ -0,0 +1,50 @@
+# thumbnails.py
+# Small JPEG thumbnails of student photos for the Registered Students table.
+import base64
+import hashlib
+import os
+from functools import lru_cache
+
+from PIL import Image, ImageOps
+
+THUMB_DIR  = "D:/wisdom/students photos/thumbs"
+THUMB_SIZE = (80, 100)   # 2x the 40x50 <img class='thumb'> box
+THUMB_QUALITY = 70
+
+def photo_hash(data: bytes) -> str:
+    """Content hash used as the thumbnail file name."""
+    return hashlib.sha1(data).hexdigest()
+
+def build_thumbnail(photo_path: str):
+    """Create (if missing) the thumbnail for a photo and return its path."""
+    with open(photo_path, "rb") as f:
+        data = f.read()
+    os.makedirs(THUMB_DIR, exist_ok=True)
+    path = os.path.join(THUMB_DIR, f"{photo_hash(data)}.jpg")
+    if os.path.exists(path):
+        return path
+
+    with Image.open(photo_path) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        thumb = ImageOps.fit(img, THUMB_SIZE, Image.LANCZOS)
+    tmp = path + ".tmp"
+    thumb.save(tmp, "JPEG", quality=THUMB_QUALITY, optimize=True)
+    os.replace(tmp, path)
+    return path
+
+@lru_cache(maxsize=4096)
+def _thumbnail_b64(photo_path: str, mtime_ns: int, size: int) -> str:
+    # keyed on mtime/size so the full photo is only hashed once per process
+    with open(build_thumbnail(photo_path), "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+def thumbnail_data_uri(photo_path):
+    """Return a `data:` URI of the photo's thumbnail, or None if unavailable."""
+    if not isinstance(photo_path, str) or not os.path.exists(photo_path):
+        return None
+    info = os.stat(photo_path)
+    try:
+        b64 = _thumbnail_b64(photo_path, info.st_mtime_ns, info.st_size)
+    except OSError:
+        return None
+    return f"data:image/jpeg;base64,{b64}"